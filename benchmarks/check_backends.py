@@ -0,0 +1,153 @@
+# Bibliotecas necessárias
+import argparse
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.generate_data import SCALES
+from benchmarks.run_benchmarks import dataset_for
+from utils.dataset import load_state
+from utils.query import query_backend
+
+# Consultas usadas pelas páginas: (dimensões, medidas, extremos)
+ROLLUPS = [
+    ([], ('time', 'rating', 'distance'), ('age', 'vehicle')),
+    (['Order_Date'], (), ()),
+    (['Road_traffic_density'], ('rating',), ()),
+    (['Weatherconditions'], ('rating',), ()),
+    (['Festival'], ('time', 'distance'), ('age', 'vehicle')),
+    (['City'], ('time', 'distance'), ()),
+    (['City', 'Road_traffic_density'], ('time',), ()),
+    (['City', 'Type_of_order'], ('time',), ()),
+    (['Delivery_person_ID'], ('rating',), ()),
+    (['City', 'Delivery_person_ID'], ('time',), ()),
+]
+
+# Valores distintos: (coluna, condição)
+NUNIQUES = [
+    ('Delivery_person_ID', None),
+    ('Delivery_person_ID', ('Festival', 'Yes')),
+]
+
+# Percentis do tempo de entrega: dimensões
+QUANTILE_GROUPS = [
+    [],
+    ['City'],
+    ['Road_traffic_density'],
+    ['Festival'],
+    ['City', 'Road_traffic_density', 'Festival'],
+]
+
+# Séries temporais: (granularidade, coluna de valores distintos)
+TIME_SERIES = [
+    ('day', None),
+    ('week', 'Delivery_person_ID'),
+    ('isoweek', 'Delivery_person_ID'),
+    ('month', 'Delivery_person_ID'),
+]
+
+# Filtros da barra lateral testados: (data limite, níveis de trânsito)
+FILTERS = [
+    (datetime(2022, 4, 13), ['Low', 'Medium', 'High', 'Jam']),
+    (datetime(2022, 3, 20), ['Low', 'Jam']),
+    (datetime(2022, 2, 15), ['High']),
+    (datetime(2022, 2, 11), ['Low', 'Medium', 'High', 'Jam']),
+    (datetime(2022, 4, 13), []),
+]
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def same_result(esperado, obtido, by):
+    """ Esta função compara dois resultados de rollup, ignorando a ordem das linhas e o tipo das chaves
+
+        Input: Dataframes esperado e obtido, e as dimensões da consulta
+        Output: texto com a diferença, ou None se forem equivalentes
+    """
+    if list(esperado.columns) != list(obtido.columns):
+        return f'colunas diferentes: {list(esperado.columns)} x {list(obtido.columns)}'
+    if len(esperado) != len(obtido):
+        return f'linhas diferentes: {len(esperado)} x {len(obtido)}'
+
+    def normalizado(df_aux):
+        df_aux = df_aux.copy()
+        for col in by:
+            if col not in ('Order_Date', 'periodo'):
+                df_aux[col] = df_aux[col].astype(str)
+        return df_aux.sort_values(by).reset_index(drop=True) if by else df_aux
+
+    esperado, obtido = normalizado(esperado), normalizado(obtido)
+    for col in esperado.columns:
+        if col in by:
+            if not (esperado[col].to_numpy() == obtido[col].to_numpy()).all():
+                return f'chaves diferentes em {col}'
+        elif not np.allclose(esperado[col].astype(float), obtido[col].astype(float), rtol=1e-9, atol=1e-6, equal_nan=True):
+            return f'valores diferentes em {col}'
+    return None
+
+def check(path):
+    """ Esta função executa todas as consultas nos dois backends e compara os resultados
+
+        Input: caminho do csv de dados
+        Output: quantidade de diferenças encontradas
+    """
+    dados = load_state(path)
+    falhas = 0
+    tempos = {'pandas': 0.0, 'duckdb': 0.0}
+
+    for date_limit, traffic_options in FILTERS:
+        consultas = {}
+        for backend in tempos:
+            inicio = time.perf_counter()
+            consultas[backend] = query_backend(dados, date_limit, traffic_options, backend, path, exact=True)
+            tempos[backend] += time.perf_counter() - inicio
+
+        def executa(backend, metodo, *args):
+            inicio = time.perf_counter()
+            resultado = getattr(consultas[backend], metodo)(*args)
+            tempos[backend] += time.perf_counter() - inicio
+            return resultado
+
+        filtro = f'{date_limit:%Y-%m-%d} {traffic_options}'
+        for by, measures, extremes in ROLLUPS:
+            erro = same_result(executa('pandas', 'rollup', by, measures, extremes),
+                               executa('duckdb', 'rollup', by, measures, extremes), by)
+            if erro:
+                falhas += 1
+                print(f'FALHA rollup {by} {filtro}: {erro}')
+
+        for column, where in NUNIQUES:
+            esperado = executa('pandas', 'nunique', column, where)
+            obtido = executa('duckdb', 'nunique', column, where)
+            if esperado != obtido:
+                falhas += 1
+                print(f'FALHA nunique {column} {where} {filtro}: {esperado} x {obtido}')
+
+        for by in QUANTILE_GROUPS:
+            erro = same_result(executa('pandas', 'quantiles', by), executa('duckdb', 'quantiles', by), by)
+            if erro:
+                falhas += 1
+                print(f'FALHA quantiles {by} {filtro}: {erro}')
+
+        for unit, distinct in TIME_SERIES:
+            erro = same_result(executa('pandas', 'time_series', unit, distinct),
+                               executa('duckdb', 'time_series', unit, distinct), ['periodo'])
+            if erro:
+                falhas += 1
+                print(f'FALHA time_series {unit} {distinct} {filtro}: {erro}')
+
+    total = len(FILTERS) * (len(ROLLUPS) + len(NUNIQUES) + len(QUANTILE_GROUPS) + len(TIME_SERIES))
+    print(f'{total - falhas}/{total} consultas equivalentes; '
+          f"tempo total pandas {tempos['pandas']:.3f}s, duckdb {tempos['duckdb']:.3f}s")
+    return falhas
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.check_backends [--scale 10k | --csv train.csv]
+    parser = argparse.ArgumentParser(description='Equivalência dos backends de consulta (pandas x duckdb)')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k')
+    parser.add_argument('--csv', help='csv de dados (padrão: dataset sintético da escala)')
+    args = parser.parse_args()
+
+    sys.exit(1 if check(args.csv or dataset_for(args.scale)) else 0)
@@ -0,0 +1,139 @@
+# Bibliotecas necessárias
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.generate_data import SCALES
+from benchmarks.run_benchmarks import dataset_for
+from utils.dataset import _load_base, clean_code, file_fingerprint, prepare_frame
+from utils.stream import stream_ingest
+
+# Tamanho dos lotes conferidos também separadamente (leitura em lotes de utils.stream)
+CHUNK_ROWS = 3_000
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def reference_clean_code(df1):
+    """ Limpeza original do dashboard, filtro a filtro e linha a linha (referência da equivalência) """
+    # 1 - Convertendo a coluna Age de texto para número
+    linhas_selecionadas = (df1["Delivery_person_Age"] != "NaN ")
+    df1 = df1.loc[linhas_selecionadas, :].copy()
+
+    linhas_selecionadas = (df1["Road_traffic_density"] != "NaN ")
+    df1 = df1.loc[linhas_selecionadas, :].copy()
+
+    linhas_selecionadas = (df1["City"] != "NaN ")
+    df1 = df1.loc[linhas_selecionadas, :].copy()
+
+    linhas_selecionadas = (df1["Festival"] != "NaN ")
+    df1 = df1.loc[linhas_selecionadas, :].copy()
+
+    df1["Delivery_person_Age"] = df1["Delivery_person_Age"].astype(int)
+
+    # 2 - Convertendo a coluna Ratings de texto para número decimal (float)
+    df1["Delivery_person_Ratings"] = df1["Delivery_person_Ratings"].astype(float)
+
+    # 3 - Convertendo a coluna order_date de texto para data
+    df1["Order_Date"] = pd.to_datetime(df1["Order_Date"], format="%d-%m-%Y")
+
+    # 4 - Convertendo multiple_deliveries de texto para número inteiro (int)
+    linhas_selecionadas = (df1["multiple_deliveries"] != "NaN ")
+    df1 = df1.loc[linhas_selecionadas, :].copy()
+
+    df1["multiple_deliveries"] = df1["multiple_deliveries"].astype(int)
+
+    # 6 - Removendo os espaços dentro de strings/texto/object
+    df1.loc[:, "ID"] = df1.loc[:, "ID"].str.strip()
+    df1.loc[:, "Road_traffic_density"] = df1.loc[:, "Road_traffic_density"].str.strip()
+    df1.loc[:, "Type_of_order"] = df1.loc[:, "Type_of_order"].str.strip()
+    df1.loc[:, "Type_of_vehicle"] = df1.loc[:, "Type_of_vehicle"].str.strip()
+    df1.loc[:, "City"] = df1.loc[:, "City"].str.strip()
+    df1.loc[:, "Festival"] = df1.loc[:, "Festival"].str.strip()
+
+    # 7 - Limpando a coluna de Time Taken
+    df1["Time_taken(min)"] = df1["Time_taken(min)"].apply( lambda x: x.split('(min) ')[1])
+    df1["Time_taken(min)"] = df1["Time_taken(min)"].astype(int)
+
+    return df1
+
+def check(path, chunksize=CHUNK_ROWS):
+    """ Esta função confere que clean_code dá exatamente o resultado da limpeza original
+
+        Compara (pd.testing.assert_frame_equal: valores, tipos, índice e ordem
+        das colunas) o csv inteiro e cada lote de chunksize linhas.
+
+        Input: caminho do csv de dados e tamanho dos lotes
+        Output: quantidade de comparações que falharam
+    """
+    raw = pd.read_csv(path)
+    partes = [('completo', raw)]
+    partes += [(f'lote {i}', raw.iloc[inicio:inicio + chunksize])
+               for i, inicio in enumerate(range(0, len(raw), chunksize))]
+
+    falhas = 0
+    tempos = {'referencia': 0.0, 'clean_code': 0.0}
+    for descricao, df in partes:
+        inicio = time.perf_counter()
+        esperado = reference_clean_code(df)
+        tempos['referencia'] += time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        obtido = clean_code(df)
+        tempos['clean_code'] += time.perf_counter() - inicio
+
+        try:
+            pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+        except AssertionError as erro:
+            falhas += 1
+            print(f'FALHA {descricao}: {erro}')
+
+    print(f'{len(partes) - falhas}/{len(partes)} limpezas idênticas ({len(raw)} linhas); '
+          f"tempo total referência {tempos['referencia']:.3f}s, clean_code {tempos['clean_code']:.3f}s")
+    return falhas
+
+def check_stream(path, chunksize=CHUNK_ROWS):
+    """ Esta função confere que o dataset lido do snapshot gravado em lotes é o da carga do csv
+
+        O csv é copiado para uma pasta temporária e processado por
+        utils.stream em lotes de chunksize linhas (pequenos o bastante para
+        que categorias novas apareçam só nos lotes seguintes); o dataframe
+        carregado do snapshot é comparado com prepare_frame do csv inteiro.
+
+        Input: caminho do csv de dados e tamanho dos lotes
+        Output: quantidade de comparações que falharam (0 ou 1)
+    """
+    esperado = prepare_frame(pd.read_csv(path))
+    pasta = tempfile.mkdtemp(prefix='check_cleaning_')
+    try:
+        copia = os.path.join(pasta, os.path.basename(path))
+        shutil.copyfile(path, copia)
+        stream_ingest(copia, chunksize)
+        obtido = _load_base(copia, file_fingerprint(copia))
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    try:
+        pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+    except AssertionError as erro:
+        print(f'FALHA snapshot em lotes de {chunksize} linhas: {erro}')
+        return 1
+    print(f'snapshot em lotes de {chunksize} linhas idêntico à carga do csv ({len(esperado)} linhas)')
+    return 0
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.check_cleaning [--scale 10k | --csv train.csv]
+    parser = argparse.ArgumentParser(description='Equivalência de clean_code com a limpeza original')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k')
+    parser.add_argument('--csv', help='csv de dados (padrão: dataset sintético da escala)')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help='linhas por lote conferido')
+    args = parser.parse_args()
+
+    csv_path = args.csv or dataset_for(args.scale)
+    falhas = check(csv_path, args.chunksize) + check_stream(csv_path, args.chunksize)
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,84 @@
+# Bibliotecas necessárias
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.check_backends import FILTERS
+from benchmarks.generate_data import SCALES
+from benchmarks.run_benchmarks import dataset_for
+from utils.dataset import load_state
+from utils.query import PandasQuery
+from utils.sketches import HLL_REGISTERS
+
+# Erro relativo máximo aceito: três erros padrão do HyperLogLog
+TOLERANCE = 3 * 1.04 / np.sqrt(HLL_REGISTERS)
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def relative_error(exato, estimado):
+    exato = np.asarray(exato, dtype=np.float64)
+    estimado = np.asarray(estimado, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        erro = np.abs(estimado - exato) / exato
+    return np.where(exato == 0, np.abs(estimado), erro)
+
+def check(path, tolerance=TOLERANCE):
+    """ Esta função compara os entregadores distintos dos sketches com as contagens exatas
+
+        Compara o total, o total por cidade e por trânsito e as séries
+        semanais e mensais, em todos os filtros de check_backends.
+
+        Input: caminho do csv de dados e o erro relativo máximo aceito
+        Output: quantidade de contagens fora da tolerância
+    """
+    dados = load_state(path)
+    falhas = 0
+    erros = []
+    tempos = {'sketch': 0.0, 'exact': 0.0}
+
+    for date_limit, traffic_options in FILTERS:
+        consultas = {modo: PandasQuery(dados, date_limit, traffic_options, exact=(modo == 'exact')) for modo in tempos}
+
+        def executa(modo, metodo, *args):
+            inicio = time.perf_counter()
+            resultado = getattr(consultas[modo], metodo)(*args)
+            tempos[modo] += time.perf_counter() - inicio
+            return resultado
+
+        filtro = f'{date_limit:%Y-%m-%d} {traffic_options}'
+        contagens = [(None, executa('exact', 'nunique', 'Delivery_person_ID'),
+                      executa('sketch', 'nunique', 'Delivery_person_ID'))]
+        for dimensao in ('City', 'Road_traffic_density'):
+            for valor in dados.frame[dimensao].dropna().unique():
+                where = (dimensao, valor)
+                contagens.append((where, executa('exact', 'nunique', 'Delivery_person_ID', where),
+                                  executa('sketch', 'nunique', 'Delivery_person_ID', where)))
+        for unit in ('week', 'month'):
+            exato = executa('exact', 'time_series', unit, 'Delivery_person_ID')['Delivery_person_ID']
+            estimado = executa('sketch', 'time_series', unit, 'Delivery_person_ID')['Delivery_person_ID']
+            contagens += list(zip([unit] * len(exato), exato, estimado))
+
+        for descricao, exato, estimado in contagens:
+            erro = float(relative_error(exato, estimado))
+            erros.append(erro)
+            if erro > tolerance:
+                falhas += 1
+                print(f'FALHA {descricao} {filtro}: exato {exato}, sketch {estimado} ({erro:.1%})')
+
+    print(f'{len(erros) - falhas}/{len(erros)} contagens dentro de {tolerance:.1%}; '
+          f'erro médio {np.mean(erros):.2%}, máximo {np.max(erros):.2%}; '
+          f"tempo total sketch {tempos['sketch']:.3f}s, exato {tempos['exact']:.3f}s")
+    return falhas
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.check_sketches [--scale 10k | --csv train.csv]
+    parser = argparse.ArgumentParser(description='Erro dos sketches de entregadores distintos (HyperLogLog x exato)')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k')
+    parser.add_argument('--csv', help='csv de dados (padrão: dataset sintético da escala)')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='erro relativo máximo aceito')
+    args = parser.parse_args()
+
+    sys.exit(1 if check(args.csv or dataset_for(args.scale), args.tolerance) else 0)
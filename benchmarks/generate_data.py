@@ -0,0 +1,131 @@
+# Bibliotecas necessárias
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Escalas padrão: nome -> quantidade de linhas
+SCALES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+# Linhas geradas (e gravadas) por vez
+CHUNK_ROWS = 500_000
+
+# Centros aproximados das cidades do dataset original (lat, lon)
+_CENTERS = np.array([
+    [22.75, 75.89], [12.97, 77.59], [19.07, 72.88], [17.39, 78.49], [13.08, 80.27],
+    [26.85, 80.95], [23.02, 72.57], [18.52, 73.86], [11.02, 76.96], [21.15, 79.09],
+])
+_CENTER_CODES = np.array(['INDO', 'BANG', 'MUM', 'HYD', 'CHEN', 'LUDH', 'AGR', 'PUNE', 'COIMB', 'JAP'])
+
+_WEATHER = np.array(['conditions Sunny', 'conditions Stormy', 'conditions Sandstorms',
+                     'conditions Cloudy', 'conditions Fog', 'conditions Windy', 'conditions NaN'])
+_TRAFFIC = np.array(['Low ', 'Jam ', 'Medium ', 'High ', 'NaN '])
+_ORDER = np.array(['Snack ', 'Meal ', 'Drinks ', 'Buffet '])
+_VEHICLE = np.array(['motorcycle ', 'scooter ', 'electric_scooter ', 'bicycle '])
+_CITY = np.array(['Metropolitian ', 'Urban ', 'Semi-Urban ', 'NaN '])
+_FESTIVAL = np.array(['No ', 'Yes ', 'NaN '])
+_DATES = pd.date_range('2022-02-11', '2022-04-06').strftime('%d-%m-%Y').to_numpy()
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def _with_nan(rng, valores, fraction):
+    valores = valores.astype(object)
+    valores[rng.random(len(valores)) < fraction] = 'NaN '
+    return valores
+
+def _clock(rng, n):
+    minutos = rng.integers(8 * 60, 24 * 60, n)
+    return np.char.add(np.char.add(np.char.zfill((minutos // 60).astype(str), 2), ':'),
+                       np.char.add(np.char.zfill((minutos % 60).astype(str), 2), ':00'))
+
+def generate_frame(n, seed=0, offset=0, n_drivers=None):
+    """ Esta função gera um dataframe sintético no formato bruto do train.csv
+
+        Reproduz as particularidades do arquivo original: o texto "NaN " nos
+        dados ausentes, textos com espaço sobrando no final e o tempo de
+        entrega no formato "(min) NN".
+
+        Input:
+            - n: quantidade de linhas
+            - seed: semente do gerador aleatório
+            - offset: número do primeiro pedido (para IDs únicos entre lotes)
+            - n_drivers: quantidade de entregadores distintos
+        Output: Dataframe bruto
+    """
+    rng = np.random.default_rng(seed)
+    if n_drivers is None:
+        n_drivers = max(1320, n // 34)
+
+    # entregadores: cada um ligado a uma cidade, com idade e avaliação
+    driver = rng.integers(0, n_drivers, n)
+    centro = driver % len(_CENTERS)
+    driver_ids = np.char.add(np.char.add(_CENTER_CODES[centro], 'RES'),
+                             np.char.add(np.char.zfill((driver // len(_CENTERS) % 20 + 1).astype(str), 2),
+                                         np.char.add('DEL0', (driver % 3 + 1).astype(str))))
+
+    idade = _with_nan(rng, rng.integers(20, 40, n).astype(str), 0.04)
+    avaliacao = np.round(rng.normal(4.6, 0.3, n).clip(1, 5), 1).astype(str)
+    avaliacao = np.where(idade == 'NaN ', 'NaN ', avaliacao)
+
+    lat_rest = _CENTERS[centro, 0] + rng.normal(0, 0.05, n)
+    lon_rest = _CENTERS[centro, 1] + rng.normal(0, 0.05, n)
+    lat_ent = lat_rest + rng.uniform(-0.15, 0.15, n)
+    lon_ent = lon_rest + rng.uniform(-0.15, 0.15, n)
+
+    trafego = _TRAFFIC[rng.choice(len(_TRAFFIC), n, p=[0.34, 0.31, 0.24, 0.10, 0.01])]
+    tempo = rng.integers(10, 55, n)
+
+    return pd.DataFrame({
+        'ID': np.char.add(np.char.mod('0x%x', offset + np.arange(n)), ' '),
+        'Delivery_person_ID': np.char.add(driver_ids, ' '),
+        'Delivery_person_Age': idade,
+        'Delivery_person_Ratings': avaliacao,
+        'Restaurant_latitude': lat_rest,
+        'Restaurant_longitude': lon_rest,
+        'Delivery_location_latitude': lat_ent,
+        'Delivery_location_longitude': lon_ent,
+        'Order_Date': _DATES[rng.integers(0, len(_DATES), n)],
+        'Time_Orderd': _with_nan(rng, _clock(rng, n), 0.04),
+        'Time_Order_picked': _clock(rng, n),
+        'Weatherconditions': _WEATHER[rng.choice(len(_WEATHER), n, p=[0.16, 0.17, 0.17, 0.17, 0.17, 0.15, 0.01])],
+        'Road_traffic_density': trafego,
+        'Vehicle_condition': rng.integers(0, 4, n),
+        'Type_of_order': _ORDER[rng.integers(0, len(_ORDER), n)],
+        'Type_of_vehicle': _VEHICLE[rng.choice(len(_VEHICLE), n, p=[0.58, 0.33, 0.08, 0.01])],
+        'multiple_deliveries': _with_nan(rng, rng.choice(4, n, p=[0.31, 0.62, 0.05, 0.02]).astype(str), 0.02),
+        'Festival': _FESTIVAL[rng.choice(len(_FESTIVAL), n, p=[0.975, 0.02, 0.005])],
+        'City': _CITY[rng.choice(len(_CITY), n, p=[0.74, 0.22, 0.01, 0.03])],
+        'Time_taken(min)': np.char.add('(min) ', tempo.astype(str)),
+    })
+
+def generate_csv(path, n, seed=42):
+    """ Esta função grava um csv sintético com n linhas, em lotes de CHUNK_ROWS
+
+        Input:
+            - path: caminho do csv
+            - n: quantidade de linhas
+            - seed: semente do gerador aleatório
+        Output: caminho do csv
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    n_drivers = max(1320, n // 34)
+    tmp_path = path + '.tmp'
+    for i, inicio in enumerate(range(0, n, CHUNK_ROWS)):
+        df = generate_frame(min(CHUNK_ROWS, n - inicio), seed=seed + i, offset=inicio, n_drivers=n_drivers)
+        df.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+    os.replace(tmp_path, path)
+    return path
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.generate_data <escala ou linhas> <arquivo.csv>
+    escala = sys.argv[1] if len(sys.argv) > 1 else '10k'
+    linhas = SCALES[escala] if escala in SCALES else int(escala)
+    destino = sys.argv[2] if len(sys.argv) > 2 else f'train_{escala}.csv'
+    generate_csv(destino, linhas)
+    print(f'{linhas} linhas gravadas em {destino}')
@@ -0,0 +1,160 @@
+# Bibliotecas necessárias
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.generate_data import SCALES
+from benchmarks.run_benchmarks import RESULTS_DIR, ROOT_DIR, dataset_for, git_commit
+from utils.api import ENDPOINTS
+
+# Filtros sorteados pelos clientes: (data, níveis de trânsito)
+FILTERS = [
+    ('2022-04-13', 'Low,Medium,High,Jam'),
+    ('2022-03-20', 'Low,Jam'),
+    ('2022-02-15', 'High'),
+    ('2022-04-06', 'Low,Medium'),
+]
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(csv_path, port):
+    """ Esta função sobe a API num processo separado e espera ela responder
+
+        Input: csv de dados e porta
+        Output: subprocess.Popen do servidor
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+    processo = subprocess.Popen([sys.executable, '-m', 'utils.api', '--port', str(port), '--csv', csv_path],
+                                cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limite = time.time() + 600
+    while time.time() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError('a API terminou antes de responder')
+        try:
+            conexao = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conexao.request('GET', '/health')
+            if conexao.getresponse().status == 200:
+                return processo
+        except OSError:
+            time.sleep(0.2)
+    processo.kill()
+    raise RuntimeError('a API não respondeu a tempo')
+
+def load(port, requests, concurrency, revalidate):
+    """ Esta função dispara as requisições em paralelo, com conexões persistentes
+
+        Input:
+            - port: porta da API
+            - requests: total de requisições
+            - concurrency: quantidade de clientes simultâneos
+            - revalidate: envia If-None-Match com o ETag da resposta anterior (respostas 304)
+        Output: dict com requisições por segundo, latências (ms) e contagem por status
+    """
+    caminhos = [f'{endpoint}?date={data}&traffic={niveis}' for endpoint in sorted(ENDPOINTS) for data, niveis in FILTERS]
+    latencias = []
+    status = {}
+    lock = threading.Lock()
+
+    def cliente(indice, quantidade):
+        conexao = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        etags = {}
+        minhas, meus_status = [], {}
+        for i in range(quantidade):
+            caminho = caminhos[(indice + i) % len(caminhos)]
+            headers = {'If-None-Match': etags[caminho]} if revalidate and caminho in etags else {}
+            inicio = time.perf_counter()
+            conexao.request('GET', caminho, headers=headers)
+            resposta = conexao.getresponse()
+            resposta.read()
+            minhas.append(time.perf_counter() - inicio)
+            meus_status[resposta.status] = meus_status.get(resposta.status, 0) + 1
+            etags[caminho] = resposta.getheader('ETag')
+        conexao.close()
+        with lock:
+            latencias.extend(minhas)
+            for codigo, n in meus_status.items():
+                status[codigo] = status.get(codigo, 0) + n
+
+    por_cliente = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    threads = [threading.Thread(target=cliente, args=(i, n)) for i, n in enumerate(por_cliente)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias = np.array(latencias) * 1000
+    return {
+        'requests': len(latencias),
+        'concurrency': concurrency,
+        'seconds': duracao,
+        'requests_per_s': len(latencias) / duracao,
+        'p50_ms': float(np.percentile(latencias, 50)),
+        'p99_ms': float(np.percentile(latencias, 99)),
+        'status': {str(codigo): n for codigo, n in sorted(status.items())},
+    }
+
+def run(csv_path, requests, concurrency):
+    """ Esta função mede a API: primeira passada (cache frio), cache quente e revalidação com ETag """
+    port = free_port()
+    servidor = start_server(csv_path, port)
+    try:
+        frio = len(ENDPOINTS) * len(FILTERS)
+        resultados = {
+            'cold': load(port, frio, 1, revalidate=False),
+            'warm': load(port, requests, concurrency, revalidate=False),
+            'revalidate': load(port, requests, concurrency, revalidate=True),
+        }
+        conexao = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        conexao.request('GET', '/metrics')
+        resultados['cache'] = json.loads(conexao.getresponse().read())['cache']
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=30)
+
+    for nome in ('cold', 'warm', 'revalidate'):
+        medida = resultados[nome]
+        print(f"{nome:12s} {medida['requests_per_s']:9.1f} req/s  p50 {medida['p50_ms']:7.2f} ms  "
+              f"p99 {medida['p99_ms']:7.2f} ms  {medida['status']}", file=sys.stderr)
+    return resultados
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.load_api [--scale 10k] [--requests 2000] [--concurrency 8]
+    parser = argparse.ArgumentParser(description='Teste de carga da API JSON de métricas')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k')
+    parser.add_argument('--csv', help='csv de dados (padrão: dataset sintético da escala)')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--output', help='arquivo json de saída (padrão: benchmarks/results/<commit>-<escala>-api.json)')
+    args = parser.parse_args()
+
+    csv_path = os.path.abspath(args.csv or dataset_for(args.scale))
+    relatorio = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'scale': args.scale if not args.csv else None,
+        'cpus': os.cpu_count(),
+        'results': run(csv_path, args.requests, args.concurrency),
+    }
+
+    saida = args.output or os.path.join(RESULTS_DIR, f"{relatorio['commit'] or 'local'}-{args.scale}-api.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2)
+    print(f'resultados gravados em {saida}', file=sys.stderr)
@@ -0,0 +1,219 @@
+# Bibliotecas necessárias
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate_data import SCALES, generate_csv
+from utils.calendar_dim import build_calendar
+from utils.cube import build_cube, filter_cube
+from utils.dataset import DatasetView, aggregate_columns, clean_code, prepare_frame, registered_aggregates
+from utils.drivers import build_driver_table
+from utils.filters import build_filter_index, filter_frame
+from utils.kpis import DELIVERY_KPIS, RESTAURANT_KPIS, compute_kpis
+from utils.maps import build_geo_grid, map_points
+from utils.pages import load_page_functions
+from utils.parallel import PARALLEL_WORKERS, partitioned_aggregates
+from utils.quantiles import build_time_histogram
+from utils.query import PandasQuery
+from utils.sketches import build_sketches
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+# Filtros da barra lateral usados nas medições: um corte de data e um subconjunto do trânsito
+DATE_LIMIT = datetime(2022, 3, 20)
+TRAFFIC_OPTIONS = ['Low', 'Medium', 'Jam']
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def measure(func, repeats):
+    """ Esta função mede o tempo e o pico de memória de uma chamada
+
+        A primeira execução roda com o tracemalloc ligado e mede o pico de
+        memória alocada; as repetições seguintes medem apenas o tempo, sem o
+        custo do rastreamento.
+
+        Input:
+            - func: função sem argumentos
+            - repeats: quantidade de execuções cronometradas
+        Output: dicionário com os tempos (segundos) e o pico de memória (bytes)
+    """
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tempos = []
+    for _ in range(repeats):
+        gc.collect()
+        inicio = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - inicio)
+
+    return {
+        'median_s': float(np.median(tempos)),
+        'min_s': float(np.min(tempos)),
+        'max_s': float(np.max(tempos)),
+        'repeats': repeats,
+        'peak_bytes': int(peak),
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def dataset_for(scale):
+    """ Esta função devolve o csv sintético da escala, gerando o arquivo se preciso """
+    path = os.path.join(DATA_DIR, f'train_{scale}.csv')
+    if not os.path.exists(path):
+        generate_csv(path, SCALES[scale])
+    return path
+
+# Agregados juntáveis comparados entre a execução serial e a paralela: nome -> (build, merge, colunas)
+_MERGEABLE = {name: (build, merge, aggregate_columns(name))
+              for name, (build, merge) in registered_aggregates().items() if merge is not None}
+
+def benchmark_cases(raw, df1, workers=PARALLEL_WORKERS):
+    """ Esta função monta a lista de casos medidos sobre um dataset já carregado
+
+        Input:
+            - raw: dataframe bruto, como lido do csv
+            - df1: dataframe preparado (limpo, tipos compactos, colunas derivadas)
+            - workers: processos usados no caso 'aggregates_parallel'
+        Output: lista de (nome, função sem argumentos)
+    """
+    empresa = load_page_functions(os.path.join(ROOT_DIR, 'pages', '1_visao_empresa.py'))
+    entregadores = load_page_functions(os.path.join(ROOT_DIR, 'pages', '2_visao_entregadores.py'))
+    restaurantes = load_page_functions(os.path.join(ROOT_DIR, 'pages', '3_visao_restaurantes.py'))
+
+    cube = build_cube(df1)
+    filter_index = build_filter_index(df1)
+    geo_grid = build_geo_grid(df1)
+    drivers = build_driver_table(df1)
+
+    dados = DatasetView('benchmark', df1, [], aggregates={
+        'cube': cube, 'filter_index': filter_index, 'drivers': drivers, 'calendar': build_calendar(df1),
+        'driver_sketches': build_sketches(df1), 'time_hist': build_time_histogram(df1)})
+
+    def consulta(exact=False):
+        # uma consulta nova por chamada: o custo dos filtros entra na medição, como num rerun
+        return PandasQuery(dados, DATE_LIMIT, TRAFFIC_OPTIONS, exact=exact)
+
+    grid1 = filter_cube(geo_grid, DATE_LIMIT, TRAFFIC_OPTIONS)
+
+    return [
+        ('clean_code', lambda: clean_code(raw)),
+        ('prepare_frame', lambda: prepare_frame(raw)),
+        ('build_cube', lambda: build_cube(df1)),
+        ('build_filter_index', lambda: build_filter_index(df1)),
+        ('build_geo_grid', lambda: build_geo_grid(df1)),
+        ('build_driver_table', lambda: build_driver_table(df1)),
+        ('build_sketches', lambda: build_sketches(df1)),
+        ('build_time_histogram', lambda: build_time_histogram(df1)),
+        ('aggregates_serial', lambda: [build(df1) for build, _, _ in _MERGEABLE.values()]),
+        ('aggregates_parallel', lambda: partitioned_aggregates(df1, _MERGEABLE, workers=workers, min_rows=0)),
+        ('sidebar_filter_frame', lambda: filter_frame(df1, filter_index, DATE_LIMIT, TRAFFIC_OPTIONS)),
+        ('sidebar_filter_cube', lambda: filter_cube(cube, DATE_LIMIT, TRAFFIC_OPTIONS)),
+        ('top_delivers', lambda: entregadores.top_delivers(consulta())),
+        ('delivery_kpis', lambda: compute_kpis(DELIVERY_KPIS, consulta())),
+        ('distance', lambda: restaurantes.distance(consulta(), fig=True)),
+        # avg_std_time_delivery foi substituída pelo motor de KPIs declarativos
+        ('restaurant_kpis', lambda: compute_kpis(RESTAURANT_KPIS, consulta())),
+        ('order_share_by_week', lambda: empresa.order_share_by_week(consulta())),
+        ('time_percentiles', lambda: restaurantes.time_percentiles(consulta(), 'City')),
+        ('quantiles_rows', lambda: filter_frame(df1, filter_index, DATE_LIMIT, TRAFFIC_OPTIONS, ['City', 'Time_taken(min)'])
+                                   .groupby('City', observed=True)['Time_taken(min)'].quantile([0.5, 0.9, 0.99])),
+        ('unique_drivers_sketch', lambda: consulta().nunique('Delivery_person_ID')),
+        ('unique_drivers_exact', lambda: consulta(exact=True).nunique('Delivery_person_ID')),
+        ('country_maps_prep', lambda: (map_points(grid1, 'entrega'), map_points(grid1, 'restaurante'))),
+    ]
+
+def run(scale, repeats, only=None, workers=PARALLEL_WORKERS):
+    """ Esta função executa a bateria de medições em uma escala
+
+        Input:
+            - scale: nome da escala ('10k', '1m', '10m')
+            - repeats: execuções cronometradas por caso
+            - only: nomes dos casos a executar (None executa todos)
+            - workers: processos usados no caso 'aggregates_parallel'
+        Output: dicionário com o ambiente e os resultados por caso
+    """
+    csv_path = dataset_for(scale)
+
+    resultados = {}
+    inicio = time.perf_counter()
+    raw = pd.read_csv(csv_path)
+    resultados['read_csv'] = {'median_s': time.perf_counter() - inicio, 'repeats': 1}
+    df1 = prepare_frame(raw)
+
+    for nome, func in benchmark_cases(raw, df1, workers):
+        if only and nome not in only:
+            continue
+        resultados[nome] = measure(func, repeats)
+        print(f"{nome:24s} {resultados[nome]['median_s'] * 1000:10.2f} ms "
+              f"{resultados[nome]['peak_bytes'] / 2**20:10.1f} MiB", file=sys.stderr)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'scale': scale,
+        'rows': int(len(raw)),
+        'rows_clean': int(len(df1)),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'workers': workers,
+        'results': resultados,
+    }
+
+def compare(atual, anterior):
+    """ Esta função imprime a razão de tempo entre duas execuções (atual / anterior) """
+    print(f"{'caso':24s} {'anterior':>12s} {'atual':>12s} {'razão':>8s}")
+    for nome, medida in atual['results'].items():
+        antes = anterior['results'].get(nome)
+        if not antes:
+            continue
+        razao = medida['median_s'] / antes['median_s'] if antes['median_s'] else float('nan')
+        print(f"{nome:24s} {antes['median_s'] * 1000:10.2f}ms {medida['median_s'] * 1000:10.2f}ms {razao:8.2f}")
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.run_benchmarks --scale 10k [--repeats 5] [--compare resultado.json]
+    parser = argparse.ArgumentParser(description='Benchmarks do dashboard da Curry Company')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--only', nargs='*', help='executa apenas os casos informados')
+    parser.add_argument('--workers', type=int, default=PARALLEL_WORKERS, help='processos do caso aggregates_parallel')
+    parser.add_argument('--output', help='arquivo json de saída (padrão: benchmarks/results/<commit>-<escala>.json)')
+    parser.add_argument('--compare', help='json de uma execução anterior para comparar')
+    args = parser.parse_args()
+
+    relatorio = run(args.scale, args.repeats, args.only, args.workers)
+
+    saida = args.output or os.path.join(RESULTS_DIR, f"{relatorio['commit'] or 'local'}-{args.scale}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2)
+    print(f'resultados gravados em {saida}', file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(relatorio, json.load(f))
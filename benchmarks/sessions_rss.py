@@ -0,0 +1,126 @@
+# Bibliotecas necessárias
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate_data import SCALES
+from benchmarks.run_benchmarks import RESULTS_DIR, dataset_for, git_commit
+from utils.cube import filter_cube
+from utils.dataset import DatasetState, clean_code, source_version
+from utils.geo import haversine_np
+from utils.kpis import RESTAURANT_KPIS, compute_kpis
+from utils.maps import load_geo_grid
+from utils.profiling import current_rss_bytes
+from utils.query import PandasQuery
+
+TRAFFIC_LEVELS = ['Low', 'Medium', 'High', 'Jam']
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def session_filters(sessions, seed=0):
+    """ Filtros da barra lateral de cada sessão simulada: (data limite, níveis de trânsito) """
+    rng = np.random.default_rng(seed)
+    datas = pd.date_range('2022-02-20', '2022-04-13')
+    filtros = []
+    for _ in range(sessions):
+        niveis = [nivel for nivel in TRAFFIC_LEVELS if rng.random() < 0.7] or ['Low']
+        filtros.append((datas[rng.integers(len(datas))].to_pydatetime(), niveis))
+    return filtros
+
+def shared_sessions(path, filtros):
+    """ Sessões sobre o dataset único do processo: cada uma guarda só filtros e resultados """
+    dados = DatasetState(path, source_version(path)).view
+    geo_grid = load_geo_grid(dados)
+    rss_carga = current_rss_bytes()
+
+    sessoes = []
+    for date_limit, traffic_options in filtros:
+        consulta = PandasQuery(dados, date_limit, traffic_options)
+        sessoes.append({
+            'kpis': compute_kpis(RESTAURANT_KPIS, consulta),
+            'avaliacoes': consulta.rollup(['Delivery_person_ID'], measures=('rating',)),
+            'semanas': consulta.time_series('week', distinct='Delivery_person_ID'),
+            'grade': filter_cube(geo_grid, date_limit, traffic_options),
+        })
+    return sessoes, rss_carga
+
+def legacy_sessions(path, filtros):
+    """ Sessões como no código original: cada uma lê e limpa o csv e altera a sua cópia filtrada """
+    rss_carga = current_rss_bytes()
+
+    sessoes = []
+    for date_limit, traffic_options in filtros:
+        df = pd.read_csv(path)
+        df1 = clean_code(df)
+        linhas = (df1['Order_Date'] < date_limit) & df1['Road_traffic_density'].isin(traffic_options)
+        df1 = df1.loc[linhas, :].copy()
+        df1['week_of_year'] = df1['Order_Date'].dt.strftime('%U')
+        df1['Distance'] = haversine_np(df1['Restaurant_latitude'], df1['Restaurant_longitude'],
+                                       df1['Delivery_location_latitude'], df1['Delivery_location_longitude'])
+        sessoes.append({'df': df, 'df1': df1})
+    return sessoes, rss_carga
+
+def measure_mode(mode, path, sessions):
+    """ Esta função mede o RSS de um modo (executado num processo próprio)
+
+        Input:
+            - mode: 'shared' ou 'legacy'
+            - path: csv de dados
+            - sessions: quantidade de sessões simultâneas
+        Output: dict com o RSS inicial, após a carga e após as sessões
+    """
+    gc.collect()
+    rss_inicio = current_rss_bytes()
+    simula = shared_sessions if mode == 'shared' else legacy_sessions
+    sessoes, rss_carga = simula(path, session_filters(sessions))
+    gc.collect()
+    rss_fim = current_rss_bytes()
+    return {
+        'mode': mode,
+        'sessions': len(sessoes),
+        'rss_start_bytes': rss_inicio,
+        'rss_loaded_bytes': rss_carga,
+        'rss_end_bytes': rss_fim,
+        'rss_per_session_bytes': (rss_fim - rss_carga) / max(1, len(sessoes)),
+    }
+
+if __name__ == '__main__':
+    # Uso: python -m benchmarks.sessions_rss [--scale 10k] [--sessions 50]
+    parser = argparse.ArgumentParser(description='RSS com várias sessões: dataset compartilhado x cópia por sessão')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k')
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--mode', choices=['shared', 'legacy'], help='mede um único modo (uso interno)')
+    parser.add_argument('--output', help='arquivo json de saída (padrão: benchmarks/results/<commit>-sessions-<escala>.json)')
+    args = parser.parse_args()
+
+    csv_path = dataset_for(args.scale)
+    if args.mode:
+        print(json.dumps(measure_mode(args.mode, csv_path, args.sessions)))
+        sys.exit(0)
+
+    # cada modo roda num processo novo, para que um não herde a memória do outro
+    modos = {}
+    for mode in ('shared', 'legacy'):
+        saida = subprocess.run([sys.executable, '-m', 'benchmarks.sessions_rss', '--scale', args.scale,
+                                '--sessions', str(args.sessions), '--mode', mode],
+                               capture_output=True, text=True, check=True).stdout
+        modos[mode] = json.loads(saida.strip().splitlines()[-1])
+
+    for mode, medida in modos.items():
+        print(f"{mode:8s} RSS final {medida['rss_end_bytes'] / 2**20:9.1f} MiB "
+              f"({medida['rss_per_session_bytes'] / 2**20:7.2f} MiB por sessão)", file=sys.stderr)
+    reducao = 1 - modos['shared']['rss_end_bytes'] / modos['legacy']['rss_end_bytes']
+    print(f'redução do RSS com {args.sessions} sessões: {reducao:.1%}', file=sys.stderr)
+
+    relatorio = {'commit': git_commit(), 'scale': args.scale, 'rss_reduction': reducao, 'modes': modos}
+    saida = args.output or os.path.join(RESULTS_DIR, f"{relatorio['commit'] or 'local'}-sessions-{args.scale}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2)
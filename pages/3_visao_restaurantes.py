@@ -1,128 +1,44 @@
 # Importando as libraries
-from haversine import haversine
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 from datetime import datetime
 
 # Bibliotecas necessárias
-import pandas as pd
 from PIL import Image
-import folium
-from streamlit_folium import folium_static
 import numpy as np
 
+from utils.dataset import load_state
+from utils.figcache import filter_state, plotly_chart_cached
+from utils.kpis import RESTAURANT_KPIS, compute_kpis
+from utils.navigation import lazy_tabs
+from utils.profiling import debug_toggle, start_profile
+from utils.quantiles import QUANTILES, quantile_column
+from utils.query import dataset_rows, query_backend
+from utils.tables import paged_table
+
 st.set_page_config(page_title='Visão Restaurantes', layout='wide')
 
+# Dimensões do gráfico de percentis: rótulo -> coluna
+PERCENTILE_DIMENSIONS = {'Cidade': 'City', 'Trânsito': 'Road_traffic_density', 'Festival': 'Festival'}
+
 # =============================================
 # Funções
 # =============================================
 
-def clean_code(df1):
-    """ Esta função tem a responsabilidade de limpar o dataframe
-    
-        Tipos de Limpeza:
-        1. Remoção dos dados Nan
-        2. Mudança do tipo da coluna de dados
-        3. Remoção dos espaços das variáveis de texto
-        4. Formatação da coluna de datas
-        5. Limpeza da coluna de tempo ( remoção do texto da variável numérica)
-
-        Input: Dataframe
-        Output: Dataframe
-    
-    """
-    # 1 - Convertendo a coluna Age de texto para número
-    linhas_selecionadas = (df1["Delivery_person_Age"] != "NaN ")
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1["Road_traffic_density"] != "NaN ")
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1["City"] != "NaN ")
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    linhas_selecionadas = (df1["Festival"] != "NaN ")
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    df1["Delivery_person_Age"] = df1["Delivery_person_Age"].astype(int)
-    
-    
-    # 2 - Convertendo a coluna Ratings de texto para número decimal (float)
-    df1["Delivery_person_Ratings"] = df1["Delivery_person_Ratings"].astype(float)
-    
-    # 3 - Convertendo a coluna order_date de texto para data
-    df1["Order_Date"] = pd.to_datetime(df1["Order_Date"], format="%d-%m-%Y")
-    
-    # 4 - Convertendo multiple_deliveries de texto para número inteiro (int)
-    linhas_selecionadas = (df1["multiple_deliveries"] != "NaN ")
-    df1 = df1.loc[linhas_selecionadas, :].copy()
-    
-    df1["multiple_deliveries"] = df1["multiple_deliveries"].astype(int)
-    
-    # 5 - Removendo os espaços dentro de strings/texto/object
-    # df1 = df1.reset_index(drop=True)
-    # for i in range(len(df1)):
-    #   df1.loc[i, "ID"] = df1.loc[i, "ID"].strip()
-    
-    # 6 - Removendo os espaços dentro de strings/texto/object
-    df1.loc[:, "ID"] = df1.loc[:, "ID"].str.strip()
-    df1.loc[:, "Road_traffic_density"] = df1.loc[:, "Road_traffic_density"].str.strip()
-    df1.loc[:, "Type_of_order"] = df1.loc[:, "Type_of_order"].str.strip()
-    df1.loc[:, "Type_of_vehicle"] = df1.loc[:, "Type_of_vehicle"].str.strip()
-    df1.loc[:, "City"] = df1.loc[:, "City"].str.strip()
-    df1.loc[:, "Festival"] = df1.loc[:, "Festival"].str.strip()
-    
-    # 7 - Limpando a coluna de Time Taken
-    df1["Time_taken(min)"] = df1["Time_taken(min)"].apply( lambda x: x.split('(min) ')[1])
-    df1["Time_taken(min)"] = df1["Time_taken(min)"].astype(int)
-
-    return df1
-
-def distance(df1, fig):
+def distance(consulta, fig):
+    # a distância de cada entrega é calculada uma única vez na carga dos dados e somada no cubo
     if fig == False:
-        cols = ["Restaurant_latitude", "Restaurant_longitude",                          "Delivery_location_latitude", "Delivery_location_longitude"]
-
-        df1["Distance"] = df1.loc[:, cols].apply(lambda x:                              haversine((x["Restaurant_latitude"], x["Restaurant_longitude"]),
-        (x["Delivery_location_latitude"],                                                x["Delivery_location_longitude"])), axis=1)
-    
-        avg_distance = np.round(df1["Distance"].mean(), 2)
+        df_aux = consulta.rollup([], measures=('distance',))
+        avg_distance = np.round(df_aux.loc[0, 'avg_distance'], 2)
         return avg_distance
     else:
-        cols = ['Delivery_location_latitude', 'Delivery_location_longitude', 'Restaurant_latitude', 'Restaurant_longitude']
-        df1['distance'] = df1.loc[:, cols].apply(lambda x: haversine((x['Restaurant_latitude'], x['Restaurant_longitude']), (x['Delivery_location_latitude'], x['Delivery_location_longitude'])), axis=1)
-        avg_distance = df1.loc[:, ['City', 'distance']].groupby('City').mean().reset_index()
-        fig = go.Figure(data=[go.Pie(labels=avg_distance['City'], values=avg_distance['distance'], pull=[0, 0.1, 0])])
+        avg_distance = consulta.rollup(['City'], measures=('distance',))
+        fig = go.Figure(data=[go.Pie(labels=avg_distance['City'], values=avg_distance['avg_distance'], pull=[0, 0.1, 0])])
         return fig
 
-def avg_std_time_delivery(df1, festival, op):
-    """
-        Esta função calcula o tempo médio e o desvio padrão do                          tempo de entrega.
-        Parâmetros:
-            Input:
-            - df: Dataframe com os dados necessários para o cálculo
-            - op: Tipo de operação que precisa ser calculado
-                'avg_time': calcula o tempo médio
-                'std_time': Calcula o desvio padrão do tempo
-            Output:
-            - df: Dataframe com 2 colunas e 1 linha
-    """
-               
-    cols = ['Time_taken(min)', 'Festival']
-    df_aux = df1.loc[:, cols].groupby(['Festival']).agg({'Time_taken(min)': ['mean', 'std']})
-
-    df_aux.columns = ['avg_time', 'std_time']
-    df_aux = df_aux.reset_index()
-
-
-    df_aux = np.round(df_aux.loc[df_aux["Festival"] == festival, op], 2)
-    return df_aux
-
-def avg_std_time_graph(df1):
-    cols = ['City', 'Time_taken(min)']
-    df_aux = df1.loc[:, cols].groupby(['City']).agg({'Time_taken(min)': ['mean', 'std']})
-    df_aux.columns = ['avg_time', 'std_time']
-    df_aux = df_aux.reset_index()
+def avg_std_time_graph(consulta):
+    df_aux = consulta.rollup(['City'])
 
     fig = go.Figure()
     fig.add_trace(go.Bar(name='Control',
@@ -132,25 +48,33 @@ def avg_std_time_graph(df1):
     fig.update_layout(barmode='group')
     return fig
 
-def avg_std_time_on_traffic(df1):
-    df_aux = df1.loc[:, ['City', 'Time_taken(min)', 'Road_traffic_density']].groupby(['City', 'Road_traffic_density']).agg({'Time_taken(min)': ['mean', 'std']})
-    df_aux.columns = ['avg_time', 'std_time']
-    df_aux = df_aux.reset_index()
+def avg_std_time_on_traffic(consulta):
+    df_aux = consulta.rollup(['City', 'Road_traffic_density'])
 
     fig = px.sunburst(df_aux, path=['City', 'Road_traffic_density'], values='avg_time', color='std_time', color_continuous_scale='RdBu', color_continuous_midpoint=np.average(df_aux['std_time']))
     return fig
 
+def time_percentiles(consulta, dimension):
+    # percentis do tempo de entrega por dimensão, juntando os histogramas das células
+    df_aux = consulta.quantiles([dimension])
+    df_aux = df_aux.melt(id_vars=[dimension], value_vars=[quantile_column(q) for q in QUANTILES],
+                         var_name='percentil', value_name='Time_taken(min)')
+    df_aux[dimension] = df_aux[dimension].astype(str)
+
+    fig = px.bar(df_aux, x=dimension, y='Time_taken(min)', color='percentil', barmode='group')
+    return fig
+
 # ===================== Inicio da Estrutura Lógica=====================================
 # =====================================================================================
 
-# Importando o dataset
-# ================================================================
-df = pd.read_csv('train.csv')
-
-# ===========================================================================
-# Limpeza dos Dados
+# Importando o dataset já limpo (cache compartilhado entre sessões)
 # ===========================================================================
-df1 = clean_code(df)
+profile = start_profile('visao_restaurantes')
+
+with profile.stage('dados') as etapa:
+    dados = load_state()
+    if profile.enabled:
+        etapa['rows'] = dataset_rows(dados)
 
 # =========================================
 # Barra Lateral
@@ -177,50 +101,50 @@ traffic_options = st.sidebar.multiselect(
     default=['Low', 'Medium', 'High', 'Jam'])
 
 st.sidebar.markdown("""---""")
+debug_toggle()
 st.sidebar.markdown('### Powered by Comunidade DS')
 
-# Filtro de data
-linhas_selecionadas = df1['Order_Date'] < date_slider
-df1 = df1.loc[linhas_selecionadas, :]
+with profile.stage('filtros'):
+    # Filtros de data e de trânsito das consultas (cubo de métricas e, para os
+    # entregadores distintos, as linhas do dataset)
+    consulta = query_backend(dados, date_slider, traffic_options)
 
-# Filtro de trânsito
-linhas_selecionadas = df1['Road_traffic_density'].isin(traffic_options) 
-df1 = df1.loc[linhas_selecionadas, :]
+# Chave dos filtros para o cache de figuras
+figure_state = filter_state(dados.version, date_slider, traffic_options)
 
 
 # =========================================
 # Layout no Streamlit
 # =========================================
-tab1, tab2, tab3 = st.tabs(['Visão Gerencial', '_', '_'])
+# só a visão escolhida é calculada (as visões '_' ainda não têm conteúdo)
+aba = lazy_tabs(['Visão Gerencial', '_', '_'], key='aba_restaurantes')
 
-with tab1:
+if aba == 'Visão Gerencial':
     with st.container():
         st.title(' Overall Metrics')
         
+        # todos os indicadores do topo calculados de uma vez (cubo + linhas filtradas)
+        with profile.stage('compute_kpis'):
+            kpis = compute_kpis(RESTAURANT_KPIS, consulta)
+
         col1, col2, col3, col4, col5, col6 = st.columns(6)
         with col1:
-            deliver_unique = len(df1.loc[:, "Delivery_person_ID"].unique())
-            col1.metric('Entregadores', deliver_unique)
+            col1.metric('Entregadores', kpis['entregadores'])
             
         with col2:
-            avg_distance = distance(df1, fig=False)
-            col2.metric('Distância média das entregas', avg_distance)
+            col2.metric('Distância média das entregas', kpis['distancia_media'])
             
         with col3:
-            df_aux = avg_std_time_delivery(df1, 'Yes', 'avg_time')
-            col3.metric('Tempo médio c/ Festival', df_aux)
+            col3.metric('Tempo médio c/ Festival', kpis['tempo_medio_festival'])
             
         with col4:
-            df_aux = avg_std_time_delivery(df1, 'Yes', 'std_time')
-            col4.metric('STD de entrega c/ Festival', df_aux)
+            col4.metric('STD de entrega c/ Festival', kpis['tempo_std_festival'])
             
         with col5:
-            df_aux = avg_std_time_delivery(df1, 'No', 'avg_time')
-            col5.metric('Tempo médio s/ Festival', df_aux)
+            col5.metric('Tempo médio s/ Festival', kpis['tempo_medio_sem_festival'])
             
         with col6:
-            df_aux = avg_std_time_delivery(df1, 'No', 'std_time')
-            col6.metric('STD de entrega s/ Festival', df_aux)
+            col6.metric('STD de entrega s/ Festival', kpis['tempo_std_sem_festival'])
             
     with st.container():
         st.markdown("""---""")
@@ -228,17 +152,15 @@ with tab1:
         
         with col1:
             st.title(' Tempo médio de entregas por cidade')
-            fig = avg_std_time_graph(df1)
-            
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart_cached(avg_std_time_graph, consulta, figure_state)
 
         with col2:
             st.title('Distribuição de distância')
 
-            delivery_mean_std_city_order_type = df1.loc[:, ["Time_taken(min)", "City", "Type_of_order"]].groupby(["City", "Type_of_order"]).agg({"Time_taken(min)": ["mean", "std"]})
-            delivery_mean_std_city_order_type.columns = ["Time_taken_mean", "Time_taken_std"]
-            delivery_mean_std_city_order_type = delivery_mean_std_city_order_type.reset_index()
-            st.dataframe(delivery_mean_std_city_order_type, use_container_width=True)
+            delivery_mean_std_city_order_type = consulta.rollup(["City", "Type_of_order"])
+            delivery_mean_std_city_order_type = delivery_mean_std_city_order_type.loc[:, ["City", "Type_of_order", "avg_time", "std_time"]]
+            delivery_mean_std_city_order_type.columns = ["City", "Type_of_order", "Time_taken_mean", "Time_taken_std"]
+            paged_table(delivery_mean_std_city_order_type, key='tempo_cidade_pedido')
 
 
     with st.container():
@@ -247,41 +169,24 @@ with tab1:
         
         col1, col2 = st.columns(2)
         with col1:
-            fig = distance(df1, fig=True)
+            with profile.stage('distance'):
+                fig = distance(consulta, fig=True)
             st.plotly_chart(fig, use_container_width=True)
 
         with col2:
-            fig = avg_std_time_on_traffic(df1)
-            st.plotly_chart(fig, use_container_width=True)
-
-    
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+            plotly_chart_cached(avg_std_time_on_traffic, consulta, figure_state)
 
+    with st.container():
+        st.markdown("""---""")
+        st.title('Percentis do tempo de entrega')
 
+        col1, col2, col3 = st.columns(3)
+        col1.metric('p50 (min)', kpis['tempo_p50'])
+        col2.metric('p90 (min)', kpis['tempo_p90'])
+        col3.metric('p99 (min)', kpis['tempo_p99'])
 
+        rotulo = st.radio('Percentis por', list(PERCENTILE_DIMENSIONS), horizontal=True, key='percentis_dimensao')
+        plotly_chart_cached(time_percentiles, consulta, figure_state, PERCENTILE_DIMENSIONS[rotulo])
 
+# Perfil do rerun: linha JSON no log e painel de depuração na barra lateral
+profile.finish()
@@ -0,0 +1,248 @@
+# Bibliotecas necessárias
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from utils.dataset import DATASET_PATH, load_process_state
+from utils.figcache import FigureCache, filter_state
+from utils.kpis import RESTAURANT_KPIS, compute_kpis
+from utils.pages import load_page_functions
+from utils.query import query_backend
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pages')
+
+# Porta padrão da API (o streamlit usa a 8501)
+API_PORT = 8600
+
+# Limites do cache de respostas: quantidade de respostas e total de bytes
+API_CACHE_SIZE = 1024
+API_CACHE_BYTES = 32 * 2**20
+
+# Revisão do formato das respostas: entra no ETag, então mudar o formato invalida os clientes
+API_REVISION = 1
+
+# Filtros padrão: os mesmos com que as páginas abrem
+TRAFFIC_LEVELS = ['Low', 'Medium', 'High', 'Jam']
+DEFAULT_DATE = datetime(2022, 4, 13)
+
+# Cache de respostas do processo, compartilhado entre as threads do servidor
+_cache = FigureCache(API_CACHE_SIZE, API_CACHE_BYTES)
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def _records(df_aux):
+    # categorias viram texto e NaN vira null no JSON
+    df_aux = df_aux.astype({col: str for col in df_aux.columns if isinstance(df_aux[col].dtype, pd.CategoricalDtype)})
+    return json.loads(df_aux.to_json(orient='records', date_format='iso', force_ascii=False))
+
+def orders_per_day(consulta):
+    """ Entregas por dia (gráfico order_metric da visão empresa) """
+    return _records(consulta.time_series('day').rename(columns={'periodo': 'Order_Date'}))
+
+def traffic_share(consulta):
+    """ Participação de cada nível de trânsito nas entregas (traffic_order_share) """
+    df_aux = consulta.rollup(['Road_traffic_density'], measures=())
+    df_aux = df_aux.loc[df_aux['Road_traffic_density'] != 'NaN', :]
+    df_aux['entregas_perc'] = df_aux['entregas'] / df_aux['entregas'].sum()
+    return _records(df_aux)
+
+def time_by_city(consulta):
+    """ Tempo médio e desvio padrão de entrega por cidade (avg_std_time_graph) """
+    return _records(consulta.rollup(['City']).loc[:, ['City', 'entregas', 'avg_time', 'std_time']])
+
+def top_drivers(consulta):
+    """ Entregadores mais rápidos e mais lentos de cada cidade (top_delivers) """
+    rapidos, lentos = _entregadores().top_delivers(consulta)
+    return {'rapidos': _records(rapidos), 'lentos': _records(lentos)}
+
+def restaurant_kpis(consulta):
+    """ Indicadores do topo da visão restaurantes """
+    return compute_kpis(RESTAURANT_KPIS, consulta)
+
+# Endpoints: caminho -> função que recebe a consulta já filtrada
+ENDPOINTS = {
+    '/metrics/orders_per_day': orders_per_day,
+    '/metrics/traffic_share': traffic_share,
+    '/metrics/time_by_city': time_by_city,
+    '/metrics/top_drivers': top_drivers,
+    '/metrics/restaurant_kpis': restaurant_kpis,
+}
+
+_paginas = {}
+
+def _entregadores():
+    if 'entregadores' not in _paginas:
+        _paginas['entregadores'] = load_page_functions(os.path.join(PAGES_DIR, '2_visao_entregadores.py'))
+    return _paginas['entregadores']
+
+def parse_filters(query):
+    """ Esta função lê os filtros da barra lateral dos parâmetros da URL
+
+        Input: dict de parse_qs, com 'date' (AAAA-MM-DD, padrão 2022-04-13)
+               e 'traffic' (níveis separados por vírgula, padrão todos;
+               vazio = nenhum)
+        Output: (data limite, lista de níveis de trânsito)
+        Erros: ValueError (resposta 400) para qualquer filtro inválido
+    """
+    texto = query.get('date', [None])[-1]
+    try:
+        date_limit = datetime.fromisoformat(texto) if texto else DEFAULT_DATE
+        # datas fora do intervalo do pandas (ex.: 0001-01-01) também falhariam só na consulta
+        pd.Timestamp(date_limit).as_unit('ns')
+    except ValueError:
+        raise ValueError(f'data inválida: {texto} (use AAAA-MM-DD)') from None
+    # Order_Date não tem fuso: comparar com uma data com fuso levantaria TypeError na consulta
+    if date_limit.tzinfo is not None:
+        raise ValueError(f'data com fuso horário não é aceita: {texto} (use AAAA-MM-DD)')
+
+    if 'traffic' in query:
+        niveis = [nivel.strip() for texto in query['traffic'] for nivel in texto.split(',') if nivel.strip()]
+    else:
+        niveis = list(TRAFFIC_LEVELS)
+    desconhecidos = sorted(set(niveis) - set(TRAFFIC_LEVELS))
+    if desconhecidos:
+        raise ValueError(f'níveis de trânsito desconhecidos: {", ".join(desconhecidos)}')
+    return date_limit, [nivel for nivel in TRAFFIC_LEVELS if nivel in niveis]
+
+def response_etag(endpoint, state):
+    """ ETag de uma resposta: depende só do endpoint, da versão do dataset e dos filtros
+
+        Como a resposta é determinada por eles, o If-None-Match é respondido
+        sem calcular nem procurar a resposta no cache.
+    """
+    version, date_limit, traffic = state
+    chave = f'{API_REVISION}|{endpoint}|{version}|{date_limit.isoformat()}|{",".join(sorted(traffic))}'
+    return '"' + hashlib.sha1(chave.encode()).hexdigest() + '"'
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    etiquetas = [etiqueta.strip() for etiqueta in if_none_match.split(',')]
+    return '*' in etiquetas or etag in etiquetas or f'W/{etag}' in etiquetas
+
+def _json_default(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f'tipo não serializável: {type(valor).__name__}')
+
+def build_response(endpoint, dados, date_limit, traffic_options, path=DATASET_PATH):
+    """ Esta função calcula o corpo JSON de um endpoint (sem cache)
+
+        Input:
+            - endpoint: caminho em ENDPOINTS
+            - dados: DatasetView
+            - date_limit, traffic_options: filtros da barra lateral
+            - path: caminho do csv de dados (backend duckdb)
+        Output: bytes do JSON
+    """
+    consulta = query_backend(dados, date_limit, traffic_options, path=path)
+    corpo = {
+        'endpoint': endpoint,
+        'dataset_version': dados.version,
+        'filters': {'date': f'{date_limit:%Y-%m-%d}', 'traffic': traffic_options},
+        'data': ENDPOINTS[endpoint](consulta),
+    }
+    return json.dumps(corpo, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """ Responde GET /metrics/<nome>?date=AAAA-MM-DD&traffic=Low,Jam com JSON
+
+        As respostas vêm do cache do processo (limitado em quantidade e em
+        bytes) e levam um ETag; um If-None-Match igual recebe 304 sem corpo.
+    """
+
+    server_version = 'CurryMetrics/1'
+    protocol_version = 'HTTP/1.1'
+    dataset_path = DATASET_PATH
+    # cabeçalhos e corpo saem num único envio: com keep-alive, envios separados
+    # esperam o ACK atrasado do cliente (~40 ms por resposta)
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def _send(self, status, corpo=b'', headers=()):
+        self.send_response(status)
+        for nome, valor in headers:
+            self.send_header(nome, valor)
+        if status != 304:
+            self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        if corpo and self.command != 'HEAD':
+            self.wfile.write(corpo)
+
+    def _send_json(self, status, conteudo):
+        corpo = json.dumps(conteudo, ensure_ascii=False).encode('utf-8')
+        self._send(status, corpo, [('Content-Type', 'application/json; charset=utf-8')])
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path in ('/', '/metrics'):
+            return self._send_json(200, {'endpoints': sorted(ENDPOINTS), 'cache': _cache.stats()})
+        if url.path == '/health':
+            return self._send_json(200, {'status': 'ok', 'dataset_version': load_process_state(self.dataset_path).version})
+        if url.path not in ENDPOINTS:
+            return self._send_json(404, {'error': f'endpoint desconhecido: {url.path}'})
+
+        try:
+            date_limit, traffic_options = parse_filters(parse_qs(url.query, keep_blank_values=True))
+        except ValueError as erro:
+            return self._send_json(400, {'error': str(erro)})
+
+        dados = load_process_state(self.dataset_path)
+        state = filter_state(dados.version, date_limit, traffic_options)
+        etag = response_etag(url.path, state)
+        headers = [('ETag', etag), ('Cache-Control', 'no-cache')]
+        if _etag_matches(self.headers.get('If-None-Match'), etag):
+            return self._send(304, headers=headers)
+
+        try:
+            corpo = _cache.get_or_build((url.path,) + state, lambda: build_response(
+                url.path, dados, date_limit, traffic_options, self.dataset_path))
+        except Exception as erro:
+            self.log_error('falha em %s: %r', self.path, erro)
+            return self._send_json(500, {'error': 'falha ao calcular a resposta'})
+        self._send(200, corpo, headers + [('Content-Type', 'application/json; charset=utf-8')])
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        # o log por requisição atrapalha os testes de carga; erros continuam em log_error
+        pass
+
+def make_server(host='127.0.0.1', port=API_PORT, path=DATASET_PATH):
+    """ Esta função cria o servidor HTTP da API (uma thread por conexão)
+
+        Input: endereço, porta e caminho do csv de dados
+        Output: ThreadingHTTPServer pronto para serve_forever()
+    """
+    handler = type('MetricsHandler', (MetricsHandler,), {'dataset_path': path})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+if __name__ == '__main__':
+    # Uso: python -m utils.api [--host 127.0.0.1] [--port 8600] [--csv train.csv]
+    parser = argparse.ArgumentParser(description='API JSON com as métricas do dashboard')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--csv', default=DATASET_PATH, help='csv de dados')
+    args = parser.parse_args()
+
+    # carrega o dataset antes de aceitar conexões
+    load_process_state(args.csv)
+    server = make_server(args.host, args.port, args.csv)
+    print(f'API ouvindo em http://{args.host}:{server.server_port}/metrics', file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,77 @@
+# Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+
+from utils.dataset import concat_frames, register_aggregate
+
+# Granularidades de tempo: nome -> coluna da dimensão calendário com o início do período
+BUCKETS = {
+    'day': 'Order_Date',
+    'week': 'week_sunday',      # semana começando no domingo (como o %U do strftime)
+    'isoweek': 'iso_week_monday',
+    'month': 'month',
+}
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def calendar_columns(datas):
+    """ Esta função monta a dimensão calendário para um conjunto de dias
+
+        Input: datas (dias, sem hora); valores repetidos são descartados
+        Output: Dataframe, uma linha por dia e ordenado, com:
+            - Order_Date: o dia
+            - day_key: dias desde 1970-01-01 (inteiro)
+            - iso_year, iso_week: ano e semana ISO (segunda a domingo)
+            - iso_week_monday: segunda-feira que inicia a semana ISO
+            - week_sunday: domingo que inicia a semana (domingo a sábado)
+            - month: primeiro dia do mês
+            - day_of_week: dia da semana (0 = segunda, 6 = domingo)
+    """
+    dias = pd.DatetimeIndex(pd.unique(pd.DatetimeIndex(datas).normalize())).sort_values()
+    dia_semana = dias.dayofweek.to_numpy()
+    iso = dias.isocalendar()
+    return pd.DataFrame({
+        'Order_Date': dias,
+        'day_key': (dias.to_numpy().astype('datetime64[D]').astype(np.int64)).astype(np.int32),
+        'iso_year': iso['year'].to_numpy(dtype=np.int16),
+        'iso_week': iso['week'].to_numpy(dtype=np.int8),
+        'iso_week_monday': dias - pd.to_timedelta(dia_semana, unit='D'),
+        'week_sunday': dias - pd.to_timedelta((dia_semana + 1) % 7, unit='D'),
+        'month': dias.to_period('M').to_timestamp(),
+        'day_of_week': dia_semana.astype(np.int8),
+    })
+
+def build_calendar(df1):
+    """ Dimensão calendário dos dias presentes no dataset """
+    return calendar_columns(df1['Order_Date'])
+
+def merge_calendars(calendar, calendar_batch):
+    """ Junta a dimensão calendário com os dias de um lote novo """
+    calendar = concat_frames([calendar, calendar_batch]).drop_duplicates('Order_Date')
+    return calendar.sort_values('Order_Date', kind='stable').reset_index(drop=True)
+
+register_aggregate('calendar', build_calendar, merge_calendars, columns=['Order_Date'])
+
+def time_bucket(datas, unit, calendar=None):
+    """ Esta função retorna o início do período (dia, semana ou mês) de cada data
+
+        O período é lido da dimensão calendário só para os dias distintos e
+        espalhado pelas linhas, sem formatar texto linha a linha. Semanas são
+        identificadas pela data de início, então a semana que cruza a virada
+        do ano não é dividida em duas.
+
+        Input:
+            - datas: Series ou array de dias
+            - unit: 'day', 'week' (domingo a sábado), 'isoweek' (segunda a domingo) ou 'month'
+            - calendar: dimensão calendário (dados.aggregate('calendar')); por padrão é montada para os dias de datas
+        Output: array datetime64 com o início do período de cada data
+    """
+    if unit not in BUCKETS:
+        raise ValueError(f'período desconhecido: {unit} (opções: {", ".join(BUCKETS)})')
+
+    codes, dias = pd.factorize(np.asarray(datas, dtype='datetime64[ns]'))
+    if calendar is None:
+        calendar = calendar_columns(dias)
+    inicio = pd.Series(calendar[BUCKETS[unit]].to_numpy(), index=calendar['Order_Date']).reindex(dias).to_numpy()
+    return pd.api.extensions.take(inicio, codes, allow_fill=True)
@@ -0,0 +1,164 @@
+# Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+
+from utils.dataset import merge_cells, register_aggregate
+
+# Dimensões do cubo (a data já vem truncada no dia)
+CUBE_KEYS = ['Order_Date', 'City', 'Road_traffic_density', 'Festival', 'Type_of_order', 'Weatherconditions']
+
+# Medidas agregadas: nome curto -> coluna do dataset
+MEASURES = {
+    'time': 'Time_taken(min)',
+    'rating': 'Delivery_person_Ratings',
+    'distance': 'Distance',
+}
+
+# Colunas com mínimo e máximo por célula: nome curto -> coluna do dataset
+EXTREMES = {
+    'age': 'Delivery_person_Age',
+    'vehicle': 'Vehicle_condition',
+}
+
+# Colunas de estatísticas de cada célula: quantidade de entregas; para cada
+# medida a contagem, a média e o M2 (soma dos quadrados dos desvios em relação
+# à média da célula); e o mínimo e o máximo de cada extremo
+EXTREME_AGG = {f'{e}_{stat}': stat for e in EXTREMES for stat in ('min', 'max')}
+STAT_COLUMNS = (['entregas'] + [f'{m}_{stat}' for m in MEASURES for stat in ('count', 'mean', 'm2')]
+                + list(EXTREME_AGG))
+
+# Colunas do dataset lidas por build_cube
+CUBE_COLUMNS = CUBE_KEYS + list(MEASURES.values()) + list(EXTREMES.values())
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def combine_cells(cells, by):
+    """ Esta função junta células do cubo pelas dimensões pedidas
+
+        Entregas e contagens são somadas e os extremos juntados pelo mínimo e
+        máximo. Média e M2 de cada medida são juntados pela fórmula de Chan
+        et al.: a média do grupo é a média das médias ponderada pelas
+        contagens, e o M2 do grupo é a soma dos M2 mais n * (média da célula -
+        média do grupo)² de cada célula. Nada é subtraído de somas grandes,
+        então a variância é estável mesmo com muitas entregas por grupo.
+
+        Input:
+            - cells: Dataframe com as dimensões de by e STAT_COLUMNS
+            - by: lista de dimensões (lista vazia = um grupo com todas as células)
+        Output: Dataframe com STAT_COLUMNS indexado pelas dimensões (ou por 0)
+    """
+    grupos = cells.groupby(by if by else np.zeros(len(cells), dtype=np.int8), observed=True)
+    agg = {'entregas': 'sum', **{f'{m}_count': 'sum' for m in MEASURES}, **EXTREME_AGG}
+    df_aux = grupos[list(agg)].agg(agg)
+
+    # grupo de cada célula, na ordem das linhas de df_aux (-1: chave nula, fora dos grupos)
+    codigos = grupos.ngroup().to_numpy()
+    validas = codigos >= 0
+    codigos = codigos[validas]
+    for m in MEASURES:
+        n = cells[f'{m}_count'].to_numpy(dtype=np.float64)[validas]
+        media = cells[f'{m}_mean'].to_numpy(dtype=np.float64)[validas]
+        m2 = cells[f'{m}_m2'].to_numpy(dtype=np.float64)[validas]
+        com_valores = n > 0
+
+        total = df_aux[f'{m}_count'].to_numpy(dtype=np.float64)
+        soma = np.bincount(codigos, weights=np.where(com_valores, n * media, 0.0), minlength=len(df_aux))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            media_grupo = soma / total
+        desvio = np.where(com_valores, m2 + n * (media - media_grupo[codigos]) ** 2, 0.0)
+
+        df_aux[f'{m}_mean'] = media_grupo
+        df_aux[f'{m}_m2'] = np.bincount(codigos, weights=desvio, minlength=len(df_aux))
+    return df_aux[STAT_COLUMNS]
+
+def build_cube(df1, keys=CUBE_KEYS):
+    """ Esta função pré-agrega o dataset limpo em um cubo de métricas
+
+        Cada célula (dia x cidade x trânsito x festival x tipo de pedido x
+        clima) guarda a quantidade de entregas, para cada medida a contagem,
+        a média e o M2, e o mínimo e o máximo de EXTREMES. Essas estatísticas
+        podem ser juntadas entre células (combine_cells), então qualquer
+        combinação de filtros é respondida juntando as células do cubo, sem
+        voltar às linhas.
+
+        Input:
+            - df1: Dataframe limpo
+            - keys: dimensões das células (padrão CUBE_KEYS; a primeira deve ser Order_Date)
+        Output: Dataframe com keys + STAT_COLUMNS, ordenado pela data
+    """
+    colunas = {key: df1[key] for key in keys}
+    colunas['entregas'] = np.ones(len(df1), dtype=np.int64)
+    agg = {'entregas': ('entregas', 'sum')}
+    for m, col in MEASURES.items():
+        colunas[m] = df1[col].astype(np.float64)
+        # a variância do groupby do pandas é calculada em uma passada estável (Welford)
+        agg.update({f'{m}_count': (m, 'count'), f'{m}_mean': (m, 'mean'), f'{m}_m2': (m, 'var')})
+    for e, col in EXTREMES.items():
+        colunas[e] = df1[col]
+        agg.update({f'{e}_min': (e, 'min'), f'{e}_max': (e, 'max')})
+
+    cube = pd.DataFrame(colunas).groupby(keys, observed=True).agg(**agg)
+    for m in MEASURES:
+        # M2 = variância amostral * (n - 1); células com uma entrega têm M2 zero
+        cube[f'{m}_m2'] = (cube[f'{m}_m2'] * (cube[f'{m}_count'] - 1)).fillna(0.0)
+    cube = cube[STAT_COLUMNS].reset_index()
+    return cube.sort_values('Order_Date', kind='stable').reset_index(drop=True)
+
+def filter_cube(cube, date_limit, traffic_options):
+    """ Aplica os filtros da barra lateral (data limite e trânsito) nas células do cubo """
+    # o cubo é ordenado pela data: o filtro de data é uma busca binária
+    cube = cube.iloc[:cube['Order_Date'].searchsorted(pd.Timestamp(date_limit))]
+    return cube.loc[cube['Road_traffic_density'].isin(traffic_options), :]
+
+def rollup(cube, by, measures=('time',), extremes=()):
+    """ Esta função agrega o cubo pelas dimensões pedidas
+
+        Input:
+            - cube: cubo (já filtrado)
+            - by: lista de dimensões do cubo (lista vazia = total geral)
+            - measures: medidas de MEASURES a resumir
+            - extremes: colunas de EXTREMES a resumir
+        Output: Dataframe com as dimensões, 'entregas', para cada medida m
+                'avg_m' (média) e 'std_m' (desvio padrão amostral, ddof=1) e,
+                para cada extremo e, 'min_e' e 'max_e'. O total geral tem
+                sempre uma linha, mesmo com o cubo vazio.
+    """
+    sums = combine_cells(cube, by)
+    if not by:
+        sums = sums.reindex([0])
+        sums['entregas'] = sums['entregas'].fillna(0).astype(np.int64)
+
+    df_aux = pd.DataFrame({'entregas': sums['entregas']}, index=sums.index)
+    for m in measures:
+        n = sums[f'{m}_count'].astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df_aux[f'avg_{m}'] = sums[f'{m}_mean'].where(n > 0)
+            df_aux[f'std_{m}'] = np.sqrt(sums[f'{m}_m2'] / (n - 1)).where(n > 1)
+    for e in extremes:
+        df_aux[f'min_{e}'] = sums[f'{e}_min']
+        df_aux[f'max_{e}'] = sums[f'{e}_max']
+
+    if by:
+        df_aux = df_aux.reset_index()
+        # só as categorias presentes no resultado (os gráficos usam a lista de categorias)
+        for col in by:
+            if isinstance(df_aux[col].dtype, pd.CategoricalDtype):
+                df_aux[col] = df_aux[col].cat.remove_unused_categories()
+    return df_aux.reset_index(drop=True)
+
+def merge_cubes(cube, cube_batch, keys=CUBE_KEYS):
+    """ Esta função junta o cubo atual com o cubo de um lote novo
+
+        Se o lote só tem dias posteriores ao cubo atual (o caso normal dos
+        arquivos diários), as células são apenas acrescentadas; caso contrário
+        só as células com chave presente no lote são juntadas (combine_cells,
+        veja merge_cells).
+
+        Input: cubo atual, cubo do lote e as dimensões usadas em build_cube
+        Output: cubo atualizado
+    """
+    return merge_cells(cube, cube_batch, keys, lambda celulas: combine_cells(celulas, keys).reset_index())
+
+# schema 2: média e M2 no lugar da soma e da soma dos quadrados
+register_aggregate('cube', build_cube, merge_cubes, schema=2, columns=CUBE_COLUMNS)
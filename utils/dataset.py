@@ -0,0 +1,592 @@
+# Bibliotecas necessárias
+import hashlib
+import importlib
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils import snapshot
+from utils.geo import haversine_np
+from utils.parallel import partitioned_aggregates
+from utils.profiling import current_profile
+
+# Caminho padrão do dataset bruto
+DATASET_PATH = 'train.csv'
+
+# Colunas de texto com poucos valores distintos, guardadas como categóricas
+CATEGORY_COLUMNS = ['Delivery_person_ID', 'Weatherconditions', 'Road_traffic_density',
+                    'Type_of_order', 'Type_of_vehicle', 'Festival', 'City']
+
+# Colunas em que o texto "NaN " marca um dado ausente (linha descartada)
+NAN_COLUMNS = ["Delivery_person_Age", "Road_traffic_density", "City", "Festival", "multiple_deliveries"]
+
+# Colunas de texto de baixa cardinalidade com espaços sobrando
+STRIP_COLUMNS = ["Road_traffic_density", "Type_of_order", "Type_of_vehicle", "City", "Festival"]
+
+# Cache das impressões digitais: caminho -> ((mtime, tamanho), hash)
+_fingerprints = {}
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def _map_unique(valores, parser):
+    """ Aplica o parser apenas nos valores distintos e espalha o resultado pelas linhas """
+    codes, uniques = pd.factorize(valores)
+    parsed = np.asarray(parser(pd.Series(uniques, dtype=uniques.dtype)))
+    return pd.api.extensions.take(parsed, codes, allow_fill=True)
+
+def _parse_time_taken(uniques):
+    return uniques.str.split('(min) ', n=1, regex=False).str[1].astype(int)
+
+# Conversões feitas sobre os valores distintos de cada coluna
+_PARSERS = {
+    "Delivery_person_Age": lambda u: u.astype(int),
+    "Delivery_person_Ratings": lambda u: u.astype(float),
+    "Order_Date": lambda u: pd.to_datetime(u, format="%d-%m-%Y"),
+    "multiple_deliveries": lambda u: u.astype(int),
+    "Time_taken(min)": _parse_time_taken,
+}
+
+def clean_code(df1, timings=None):
+    """ Esta função tem a responsabilidade de limpar o dataframe
+    
+        Tipos de Limpeza:
+        1. Remoção dos dados Nan
+        2. Mudança do tipo da coluna de dados
+        3. Remoção dos espaços das variáveis de texto
+        4. Formatação da coluna de datas
+        5. Limpeza da coluna de tempo ( remoção do texto da variável numérica)
+
+        Todos os filtros de "NaN " são combinados em uma única máscara e cada
+        coluna é materializada uma única vez já filtrada. As conversões de tipo
+        e a remoção de espaços são feitas sobre os valores distintos da coluna
+        (poucas dezenas) em vez de linha a linha.
+
+        Input:
+            - df1: Dataframe bruto (pd.read_csv)
+            - timings: dict opcional que recebe o tempo (s) de cada etapa
+        Output: Dataframe
+    
+    """
+    if timings is None:
+        timings = {}
+
+    # 1 - Máscara única com todas as linhas sem "NaN "
+    inicio = time.perf_counter()
+    linhas_selecionadas = np.ones(len(df1), dtype=bool)
+    for col in NAN_COLUMNS:
+        linhas_selecionadas &= (df1[col] != "NaN ").to_numpy()
+    index = df1.index[linhas_selecionadas]
+    timings['filtro'] = time.perf_counter() - inicio
+
+    colunas = {}
+
+    # 2 - Conversão de tipos: idade, avaliação, data, múltiplas entregas e tempo
+    inicio = time.perf_counter()
+    for col, parser in _PARSERS.items():
+        colunas[col] = _map_unique(df1[col].to_numpy()[linhas_selecionadas], parser)
+    timings['tipos'] = time.perf_counter() - inicio
+
+    # 3 - Removendo os espaços dentro de strings/texto/object
+    inicio = time.perf_counter()
+    colunas["ID"] = pd.Series(df1["ID"].to_numpy()[linhas_selecionadas]).str.strip().to_numpy()
+    for col in STRIP_COLUMNS:
+        colunas[col] = _map_unique(df1[col].to_numpy()[linhas_selecionadas], lambda u: u.str.strip())
+    timings['texto'] = time.perf_counter() - inicio
+
+    # 4 - Demais colunas, apenas filtradas, na ordem original
+    inicio = time.perf_counter()
+    for col in df1.columns:
+        if col not in colunas:
+            colunas[col] = df1[col].to_numpy()[linhas_selecionadas]
+    df1 = pd.DataFrame({col: colunas[col] for col in df1.columns}, index=index)
+    timings['montagem'] = time.perf_counter() - inicio
+
+    return df1
+
+def file_fingerprint(path=DATASET_PATH):
+    """ Esta função calcula a impressão digital (hash) do arquivo de dados
+
+        O hash só é recalculado quando o mtime ou o tamanho do arquivo mudam,
+        então a chamada a cada rerun custa apenas um os.stat().
+
+        Input: caminho do arquivo
+        Output: string com o hash sha1 do conteúdo
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _fingerprints.get(path)
+    if cached is None or cached[0] != key:
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 20), b''):
+                sha.update(bloco)
+        _fingerprints[path] = (key, sha.hexdigest())
+
+    return _fingerprints[path][1]
+
+def compact_types(df1):
+    """ Esta função converte as colunas de texto de baixa cardinalidade em categóricas
+
+        Input: Dataframe limpo
+        Output: Dataframe com as colunas de CATEGORY_COLUMNS como 'category'
+    """
+    return df1.astype({col: 'category' for col in CATEGORY_COLUMNS})
+
+def add_derived_columns(df1):
+    """ Esta função acrescenta as colunas derivadas calculadas uma única vez na carga
+
+        Colunas:
+        1. Distance: distância (km) entre o restaurante e o local de entrega
+
+        Input: Dataframe limpo
+        Output: Dataframe com as colunas derivadas
+    """
+    df1["Distance"] = haversine_np(df1["Restaurant_latitude"], df1["Restaurant_longitude"],
+                                   df1["Delivery_location_latitude"], df1["Delivery_location_longitude"])
+    return df1
+
+def prepare_frame(df, timings=None):
+    """ Esta função transforma um dataframe bruto no formato do dataset limpo
+
+        Limpeza (clean_code), tipos compactos, ordenação por Order_Date e
+        colunas derivadas. É usada tanto na carga completa do csv quanto nos
+        lotes incrementais.
+
+        Input:
+            - df: Dataframe bruto (pd.read_csv)
+            - timings: dict opcional que recebe o tempo (s) de cada etapa
+        Output: Dataframe limpo
+    """
+    df1 = compact_types(clean_code(df, timings))
+    df1 = df1.sort_values('Order_Date', kind='stable', ignore_index=True)
+    return add_derived_columns(df1)
+
+def concat_frames(frames):
+    """ Esta função concatena dataframes limpos mantendo as colunas categóricas
+
+        As categorias de cada coluna são unidas antes do pd.concat, que
+        do contrário converteria para texto as colunas com categorias diferentes.
+
+        Input: lista de Dataframes com as mesmas colunas
+        Output: Dataframe concatenado, com índice 0..n-1
+    """
+    frames = [f for f in frames if len(f)] or frames[:1]
+    if len(frames) == 1:
+        return frames[0]
+
+    dtypes = {}
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            categorias = frames[0][col].cat.categories
+            for f in frames[1:]:
+                categorias = categorias.union(f[col].cat.categories)
+            dtypes[col] = pd.CategoricalDtype(categorias)
+
+    frames = [f.astype({col: dtype for col, dtype in dtypes.items() if f[col].dtype != dtype}) for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+def _take_rows(table, cells, ordem):
+    # concatena table e cells coluna a coluna e pega as linhas na ordem pedida,
+    # com uma única cópia de cada coluna (categorias unidas como em concat_frames)
+    colunas = {}
+    for col in table.columns:
+        atual, novo = table[col], cells[col]
+        if isinstance(atual.dtype, pd.CategoricalDtype):
+            categorias = atual.cat.categories.union(novo.cat.categories)
+            codigos = [atual.cat.codes.to_numpy(), novo.cat.codes.to_numpy()]
+            for i, serie in enumerate((atual, novo)):
+                if not serie.cat.categories.equals(categorias):
+                    mapa = np.append(categorias.get_indexer(serie.cat.categories), -1)
+                    codigos[i] = mapa[codigos[i]]
+            colunas[col] = pd.Categorical.from_codes(np.concatenate(codigos)[ordem], dtype=pd.CategoricalDtype(categorias))
+        else:
+            colunas[col] = np.concatenate([atual.to_numpy(), novo.to_numpy()])[ordem]
+    return pd.DataFrame(colunas, copy=False)
+
+def merge_cells(table, table_batch, keys, combine):
+    """ Esta função junta um agregado por células com o agregado de um lote novo
+
+        Se o lote só tem dias posteriores ao agregado atual (o caso normal dos
+        arquivos diários), as células são apenas acrescentadas. Caso contrário
+        só as células do agregado com chave presente no lote são reagrupadas
+        com ele: elas são achadas pelo hash das chaves, dentro do intervalo de
+        dias do lote, e as células reagrupadas são inseridas na posição do seu
+        dia. O resto do agregado é só copiado, sem reagrupar nem reordenar o
+        histórico.
+
+        Input:
+            - table: agregado atual, ordenado por Order_Date
+            - table_batch: agregado do lote, com as mesmas colunas
+            - keys: dimensões das células (a primeira deve ser Order_Date)
+            - combine: função que reagrupa um Dataframe de células pelas keys
+        Output: agregado atualizado, ordenado por Order_Date
+    """
+    if len(table) == 0 or len(table_batch) == 0 or table_batch['Order_Date'].min() > table['Order_Date'].max():
+        return concat_frames([table, table_batch])
+
+    datas = table['Order_Date'].to_numpy()
+    inicio = datas.searchsorted(table_batch['Order_Date'].min().to_datetime64())
+    fim = datas.searchsorted(table_batch['Order_Date'].max().to_datetime64(), side='right')
+
+    # um hash repetido por acaso só reagrupa uma célula a mais; o resultado continua exato
+    hashes = pd.Series(pd.util.hash_pandas_object(table[keys].iloc[inicio:fim], index=False).to_numpy())
+    tocadas = inicio + np.flatnonzero(hashes.isin(pd.util.hash_pandas_object(table_batch[keys], index=False)).to_numpy())
+
+    cells = combine(concat_frames([table.iloc[tocadas], table_batch]))
+    cells = cells.sort_values('Order_Date', kind='stable').reset_index(drop=True)
+
+    # posição final: as células mantidas na ordem atual, cada célula reagrupada depois das do seu dia
+    mantidas = np.delete(np.arange(len(table)), tocadas)
+    posicoes = datas[mantidas].searchsorted(cells['Order_Date'].to_numpy(), side='right')
+    ordem = np.insert(mantidas, posicoes, len(table) + np.arange(len(cells)))
+    return _take_rows(table, cells[table.columns], ordem)
+
+def source_version(path=DATASET_PATH):
+    """ Esta função retorna a versão (hash do csv de origem) do dataset base
+
+        Se o snapshot colunar foi gerado a partir do csv atual (mesmo mtime e
+        tamanho), ou se só o snapshot existe, a versão vem dos metadados do
+        snapshot e o csv não precisa ser lido.
+
+        Input: caminho do csv
+        Output: string com o hash sha1 do csv
+    """
+    metadata = snapshot.read_metadata(snapshot.snapshot_path(path))
+    if metadata is not None:
+        if not os.path.exists(path):
+            return metadata['sha1']
+        stat = os.stat(path)
+        if (metadata['mtime_ns'], metadata['size']) == (stat.st_mtime_ns, stat.st_size):
+            return metadata['sha1']
+
+    return file_fingerprint(path)
+
+def build_snapshot(path=DATASET_PATH, timings=None):
+    """ Esta função lê o csv, limpa os dados e grava o snapshot colunar
+
+        Input:
+            - path: caminho do csv
+            - timings: dict opcional que recebe o tempo (s) de cada etapa
+        Output: Dataframe limpo
+    """
+    if timings is None:
+        timings = {}
+
+    stat = os.stat(path)
+    inicio = time.perf_counter()
+    df = pd.read_csv(path)
+    timings['leitura'] = time.perf_counter() - inicio
+
+    df1 = prepare_frame(df, timings)
+    del df
+    snapshot.write_snapshot(df1, snapshot.snapshot_path(path), file_fingerprint(path), stat)
+    current_profile().add_timings('carga', timings)
+    return df1
+
+def _load_base(path, base_sha1):
+    snap_path = snapshot.snapshot_path(path)
+    metadata = snapshot.read_metadata(snap_path)
+    if metadata is not None and metadata['sha1'] == base_sha1:
+        # snapshots gravados em lotes (utils.stream) têm as categorias na ordem
+        # em que apareceram nos lotes e podem não estar ordenados pela data
+        df1 = compact_types(snapshot.read_snapshot(snap_path))
+        # (astype não reordena: CategoricalDtype sem ordem ignora a ordem das categorias na comparação)
+        for col in CATEGORY_COLUMNS:
+            if not df1[col].cat.categories.is_monotonic_increasing:
+                df1[col] = df1[col].cat.reorder_categories(df1[col].cat.categories.sort_values())
+        if not df1['Order_Date'].is_monotonic_increasing:
+            df1 = df1.sort_values('Order_Date', kind='stable', ignore_index=True)
+        return df1
+
+    # snapshot ausente ou desatualizado: volta para o csv
+    return build_snapshot(path)
+
+# Agregados mantidos junto com o dataset: nome -> (build(df1), merge(agregado, agregado_do_lote))
+_AGGREGATES = {}
+
+# Versão do código de cada agregado: nome -> schema (gravado com o agregado no disco)
+_AGGREGATE_SCHEMAS = {}
+
+# Colunas do dataset lidas por cada agregado: nome -> lista (None = todas)
+_AGGREGATE_COLUMNS = {}
+
+# Módulos que registram os seus agregados (register_aggregate) ao serem
+# importados. O dataset os importa antes de consultar o registro, então quem
+# usa registered_aggregates() ou DatasetView.aggregate() não precisa importá-los.
+AGGREGATE_MODULES = ('utils.calendar_dim', 'utils.cube', 'utils.drivers', 'utils.filters',
+                     'utils.maps', 'utils.quantiles', 'utils.sketches')
+
+def _import_aggregates():
+    for module in AGGREGATE_MODULES:
+        importlib.import_module(module)
+
+def registered_aggregates():
+    """ Retorna os agregados registrados: nome -> (build, merge) """
+    _import_aggregates()
+    return dict(_AGGREGATES)
+
+def register_aggregate(name, build, merge, schema=1, columns=None):
+    """ Esta função registra um agregado derivado do dataset
+
+        Input:
+            - name: nome do agregado
+            - build: função que calcula o agregado a partir de um Dataframe limpo
+            - merge: função que junta o agregado atual com o agregado de um lote
+                     novo, ou None para refazer o agregado a partir do dataset
+                     completo quando chegam lotes novos
+            - schema: versão do código do agregado, gravada junto com ele no
+                      disco; deve ser incrementada sempre que build ou merge
+                      mudarem o resultado, para que os agregados já gravados
+                      sejam refeitos
+            - columns: colunas do dataset que build lê (None = todas); só
+                       elas são enviadas aos processos da agregação paralela
+        Output: None
+    """
+    _AGGREGATES[name] = (build, merge)
+    _AGGREGATE_SCHEMAS[name] = schema
+    _AGGREGATE_COLUMNS[name] = None if columns is None else list(columns)
+
+def aggregate_schema(name):
+    """ Retorna a versão do código (schema) de um agregado registrado """
+    _import_aggregates()
+    return _AGGREGATE_SCHEMAS[name]
+
+def aggregate_columns(name):
+    """ Retorna as colunas do dataset lidas por um agregado registrado (None = todas) """
+    _import_aggregates()
+    return _AGGREGATE_COLUMNS[name]
+
+class DatasetView:
+    """ Uma versão imutável do dataset: o dataframe, sua versão e os agregados sobre ele
+
+        Tudo o que uma página usa num rerun deve vir da mesma DatasetView,
+        para que o dataframe e os agregados (cubo, índices) sejam da mesma
+        versão mesmo que um lote novo chegue no meio do rerun.
+
+        As métricas e os gráficos vêm só dos agregados. O dataframe (o base
+        mais os lotes incrementais) só é montado quando uma visão precisa das
+        linhas: contagens exatas e agregados sem merge.
+    """
+
+    def __init__(self, version, frame, applied, aggregates=None, stored=None, store=None, batches=()):
+        """ Input:
+                - version: versão do dataset (hash do csv base e dos lotes)
+                - frame: Dataframe base, ou função sem argumentos que o carrega no primeiro uso
+                - applied: hashes dos lotes incrementais aplicados
+                - aggregates: agregados já calculados para esta versão
+                - stored: função que lê do disco um agregado do dataset base (ou None)
+                - store: função que grava no disco um agregado do dataset base
+                - batches: Dataframes dos lotes incrementais aplicados sobre o base
+        """
+        self.version = version
+        self.applied = applied
+        self._base = frame if callable(frame) else (lambda: frame)
+        self._batches = tuple(batches)
+        self._frame = None
+        self._aggregates = dict(aggregates or {})
+        self._stored = stored
+        self._store = store
+        self._lock = threading.Lock()
+        self._frame_lock = threading.Lock()
+
+    @property
+    def frame(self):
+        """ Dataframe limpo desta versão, ordenado por Order_Date, montado no primeiro uso """
+        if self._frame is None:
+            with self._frame_lock:
+                if self._frame is None:
+                    frame = concat_frames([self._base()] + list(self._batches))
+                    if not frame['Order_Date'].is_monotonic_increasing:
+                        frame = frame.sort_values('Order_Date', kind='stable', ignore_index=True)
+                    self._frame = frame
+        return self._frame
+
+    @property
+    def rows(self):
+        """ Quantidade de linhas da versão, sem montar o dataframe (soma das entregas do cubo) """
+        if self._frame is not None:
+            return len(self._frame)
+        return int(self.aggregate('cube')['entregas'].sum())
+
+    def _base_aggregates(self, name):
+        # agregados juntáveis do dataset base: o pedido, se já foi gravado; senão
+        # o dataframe base é lido uma vez e todos os agregados juntáveis que
+        # ainda não foram gravados são calculados na mesma passada
+        aggregate = self._stored(name) if self._stored is not None else None
+        if aggregate is not None:
+            return {name: aggregate}
+
+        base = {}
+        faltando = {}
+        for outro, (build, merge) in registered_aggregates().items():
+            if merge is None or (outro != name and outro in self._aggregates):
+                continue
+            gravado = self._stored(outro) if outro != name and self._stored is not None else None
+            if gravado is not None:
+                base[outro] = gravado
+            else:
+                faltando[outro] = (build, merge, aggregate_columns(outro))
+
+        # em paralelo por partições de datas quando o dataset é grande (veja utils.parallel)
+        for outro, aggregate in partitioned_aggregates(self._base(), faltando).items():
+            if self._store is not None:
+                self._store(outro, aggregate)
+            base[outro] = aggregate
+        return base
+
+    def aggregate(self, name):
+        """ Retorna o agregado registrado com esse nome
+
+            Na primeira vez o agregado do dataset base é lido do disco, se já
+            foi gravado para essa versão do csv e do código (utils.stream ou um
+            processo anterior). Senão ele é calculado a partir do dataframe
+            base, junto com os outros agregados juntáveis que faltam, e
+            gravado. Os lotes incrementais são somados a ele pelo merge.
+            Agregados sem merge são calculados sobre o dataframe completo.
+        """
+        if name not in self._aggregates:
+            with self._lock:
+                if name not in self._aggregates:
+                    build, merge = registered_aggregates()[name]
+                    if merge is None:
+                        self._aggregates[name] = build(self.frame)
+                    else:
+                        for outro, aggregate in self._base_aggregates(name).items():
+                            build, merge = _AGGREGATES[outro]
+                            for batch in self._batches:
+                                aggregate = merge(aggregate, build(batch))
+                            self._aggregates[outro] = aggregate
+        return self._aggregates[name]
+
+    def apply_batch(self, batch, batch_sha1s):
+        """ Esta função retorna uma nova DatasetView com um lote incremental aplicado
+
+            Cada agregado já calculado é atualizado com o agregado do lote,
+            sem recalcular o histórico. Agregados sem merge são descartados e
+            refeitos no próximo acesso. O lote é guardado ao lado do dataset
+            base; o dataframe completo só é montado se alguma visão o usar.
+
+            Input:
+                - batch: Dataframe limpo do lote
+                - batch_sha1s: hashes dos csv que formam o lote
+            Output: DatasetView
+        """
+        aggregates = {}
+        for name, aggregate in self._aggregates.items():
+            build, merge = _AGGREGATES[name]
+            if merge is not None:
+                aggregates[name] = merge(aggregate, build(batch))
+
+        applied = self.applied + list(batch_sha1s)
+        version = hashlib.sha1(' '.join([self.version] + list(batch_sha1s)).encode()).hexdigest()
+        return DatasetView(version, self._base, applied, aggregates, self._stored, self._store,
+                           self._batches + (batch,))
+
+class DatasetState:
+    """ Dataset limpo de um processo, atualizado com os lotes incrementais
+
+        O dataset base vem do snapshot do csv e é mantido ordenado por
+        Order_Date; ele só é carregado quando alguma visão precisa das
+        linhas, e os agregados do base são gravados no disco para os
+        próximos processos. Lotes incrementais gravados por utils.ingest são
+        aplicados em refresh(): só os lotes novos são lidos, e a DatasetView
+        atual é trocada por uma nova, nunca alterada, então quem já tem uma
+        view em mãos continua com uma versão consistente.
+    """
+
+    def __init__(self, path, base_sha1):
+        self.path = path
+        self.base_sha1 = base_sha1
+        self._base = None
+        self._base_lock = threading.Lock()
+        self.view = DatasetView(base_sha1, self._base_frame, [], stored=self._read_aggregate, store=self._write_aggregate)
+        self._deltas_key = None
+        self._lock = threading.Lock()
+
+    def _base_frame(self):
+        with self._base_lock:
+            if self._base is None:
+                self._base = _load_base(self.path, self.base_sha1)
+            return self._base
+
+    def _read_aggregate(self, name):
+        return snapshot.read_aggregate(self.path, name, self.base_sha1, aggregate_schema(name))
+
+    def _write_aggregate(self, name, aggregate):
+        try:
+            snapshot.write_aggregate(aggregate, self.path, name, self.base_sha1, aggregate_schema(name))
+        except OSError:
+            # sem permissão de escrita ao lado do csv: o agregado fica só na memória
+            pass
+
+    def refresh(self):
+        """ Aplica os lotes incrementais ainda não aplicados e retorna a view atual """
+        try:
+            stat = os.stat(snapshot.deltas_dir(self.path))
+        except FileNotFoundError:
+            return self.view
+        if stat.st_mtime_ns == self._deltas_key:
+            return self.view
+
+        with self._lock:
+            deltas = snapshot.list_deltas(self.path, self.base_sha1)
+            novos = deltas[len(self.view.applied):]
+            if novos:
+                batch = concat_frames([snapshot.read_snapshot(delta_path) for delta_path, _ in novos])
+                self.view = self.view.apply_batch(batch, [batch_sha1 for _, batch_sha1 in novos])
+            self._deltas_key = stat.st_mtime_ns
+
+        return self.view
+
+@st.cache_resource(show_spinner='Carregando os dados...', max_entries=2)
+def _load_state(path, base_sha1):
+    return DatasetState(path, base_sha1)
+
+def load_state(path=DATASET_PATH):
+    """ Esta função retorna a versão atual do dataset do processo, com os lotes novos já aplicados
+
+        O estado é compartilhado entre todas as sessões e só é recriado
+        quando o hash do csv base muda.
+
+        Input: caminho do arquivo
+        Output: DatasetView
+    """
+    return _load_state(path, source_version(path)).refresh()
+
+# Estados do dataset dos processos sem o streamlit: caminho -> DatasetState
+_process_states = {}
+_process_states_lock = threading.Lock()
+
+def load_process_state(path=DATASET_PATH):
+    """ Esta função é o load_state dos processos que rodam sem o streamlit (API, renderização)
+
+        Sem o servidor do streamlit o st.cache_resource não guarda nada, e
+        cada load_state() releria o snapshot e refaria os agregados. Aqui o
+        estado fica num dicionário do processo, com as mesmas regras: é
+        recriado quando o hash do csv base muda e recebe os lotes novos.
+
+        Input: caminho do arquivo
+        Output: DatasetView
+    """
+    base_sha1 = source_version(path)
+    with _process_states_lock:
+        state = _process_states.get(path)
+        if state is None or state.base_sha1 != base_sha1:
+            state = _process_states[path] = DatasetState(path, base_sha1)
+    return state.refresh()
+
+if __name__ == '__main__':
+    # Uso: python -m utils.dataset [train.csv]
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DATASET_PATH
+    timings = {}
+    df1 = build_snapshot(csv_path, timings)
+    print(f'{len(df1)} linhas gravadas em {snapshot.snapshot_path(csv_path)}')
+    for etapa, segundos in timings.items():
+        print(f'  {etapa:<10} {segundos:8.3f}s')
@@ -0,0 +1,34 @@
+# Bibliotecas necessárias
+from utils.cube import EXTREMES, MEASURES, build_cube, merge_cubes
+from utils.dataset import register_aggregate
+
+# Dimensões da tabela de entregadores: uma partição por dia (e por nível de
+# trânsito, para o filtro da barra lateral) de cada entregador
+DRIVER_KEYS = ['Order_Date', 'Road_traffic_density', 'City', 'Delivery_person_ID', 'Type_of_vehicle']
+
+# Colunas do dataset lidas por build_driver_table
+DRIVER_COLUMNS = DRIVER_KEYS + list(MEASURES.values()) + list(EXTREMES.values())
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def build_driver_table(df1):
+    """ Esta função monta a tabela resumo dos entregadores
+
+        Cada linha é um entregador em um dia (com cidade, trânsito e tipo de
+        veículo) e guarda as mesmas estatísticas do cubo: quantidade de
+        entregas, contagem, média e M2 das avaliações e do tempo de entrega,
+        e mínimo/máximo da idade e da condição do veículo. O filtro de data
+        junta as partições diárias até a data limite, e todas as visões por
+        entregador saem de rollup() sobre esta tabela.
+
+        Input: Dataframe limpo
+        Output: Dataframe com DRIVER_KEYS + STAT_COLUMNS, ordenado pela data
+    """
+    return build_cube(df1, DRIVER_KEYS)
+
+def merge_driver_tables(drivers, drivers_batch):
+    """ Junta a tabela de entregadores com a de um lote novo (os dias novos viram partições novas) """
+    return merge_cubes(drivers, drivers_batch, DRIVER_KEYS)
+
+register_aggregate('drivers', build_driver_table, merge_driver_tables, schema=2, columns=DRIVER_COLUMNS)
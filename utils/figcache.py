@@ -0,0 +1,192 @@
+# Bibliotecas necessárias
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import plotly.io
+import plotly.utils
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.profiling import current_profile
+from utils.query import BACKEND_ENV, DISTINCT_ENV
+
+# Quantidade máxima de figuras guardadas no cache (por processo)
+FIGURE_CACHE_SIZE = 256
+
+logger = logging.getLogger(__name__)
+
+# Uma thread por processo monta em segundo plano as figuras das visões não exibidas
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='figcache-prefetch')
+_prefetch_pending = set()
+_prefetch_lock = threading.Lock()
+# Último estado dos filtros pedido por cada sessão: trabalhos de estados anteriores são descartados
+_prefetch_latest = {}
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+class FigureCache:
+    """ Cache LRU, com tamanho limitado, das figuras já serializadas
+
+        Guarda o JSON que o st.plotly_chart enviaria ao navegador (ou o HTML
+        dos mapas), então uma figura repetida não refaz os groupbys nem a
+        serialização. Conta os acertos (hits) e as faltas (misses). Com
+        max_bytes, o tamanho total guardado também é limitado (as entradas
+        mais antigas saem primeiro).
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE, max_bytes=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """ Retorna o JSON guardado para a chave, ou chama build() e guarda o resultado """
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return spec
+            self.misses += 1
+
+        spec = build()
+
+        with self._lock:
+            antigo = self._entries.pop(key, None)
+            if antigo is not None:
+                self._bytes -= len(antigo)
+            self._entries[key] = spec
+            self._bytes += len(spec)
+            while len(self._entries) > self.maxsize or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes and len(self._entries) > 1):
+                _, removido = self._entries.popitem(last=False)
+                self._bytes -= len(removido)
+        return spec
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def stats(self):
+        """ Retorna os contadores do cache: hits, misses, entradas e bytes guardados """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+@st.cache_resource
+def get_figure_cache():
+    """ Cache de figuras do processo, compartilhado entre as sessões """
+    return FigureCache()
+
+def filter_state(version, date_limit, traffic_options):
+    """ Chave do estado dos filtros: versão do dataset, data limite e conjunto de níveis de trânsito """
+    return (version, pd.Timestamp(date_limit), frozenset(traffic_options))
+
+def serialize_figure(fig):
+    """ Serializa a figura do mesmo jeito que o st.plotly_chart """
+    return json.dumps(fig.to_dict(), cls=plotly.utils.PlotlyJSONEncoder)
+
+def _cache_key(func, state, *args):
+    # o backend e o modo dos distintos mudam os números das figuras com os mesmos filtros
+    modo = (os.environ.get(BACKEND_ENV, 'pandas'), os.environ.get(DISTINCT_ENV, 'sketch'))
+    return (func.__code__.co_filename, func.__qualname__) + args + state + modo
+
+def _profiled_get(func, data, state, args, build):
+    # a etapa do perfil marca se a figura veio do cache ou foi montada agora
+    with current_profile().stage(func.__name__, rows=len(data) if hasattr(data, '__len__') else None) as etapa:
+        etapa['cache'] = 'hit'
+
+        def build_profiled():
+            etapa['cache'] = 'miss'
+            return build()
+
+        return get_figure_cache().get_or_build(_cache_key(func, state, *args), build_profiled)
+
+def html_cached(func, data, state, *args):
+    """ Esta função retorna o HTML gerado por func(data, *args), usando o cache de figuras
+
+        Input:
+            - func: função que gera o HTML a partir dos dados filtrados
+            - data: dados filtrados passados para func
+            - state: chave dos filtros (filter_state) que gerou data
+            - args: demais argumentos de func, que também entram na chave
+        Output: string com o HTML
+    """
+    return _profiled_get(func, data, state, args, lambda: func(data, *args))
+
+def plotly_chart_cached(func, data, state, *args, use_container_width=True):
+    """ Esta função desenha um gráfico plotly usando o cache de figuras
+
+        Input:
+            - func: função que monta a figura a partir dos dados filtrados
+            - data: dados filtrados (Dataframe, cubo ou objeto de consultas) passados para func
+            - state: chave dos filtros (filter_state) que gerou data
+            - args: demais argumentos de func, que também entram na chave
+            - use_container_width: mesmo parâmetro do st.plotly_chart
+        Output: None
+    """
+    spec = _profiled_get(func, data, state, args, lambda: serialize_figure(func(data, *args)))
+    st.plotly_chart(plotly.io.from_json(spec), use_container_width=use_container_width)
+
+def prefetch(func, load, state, *args, html=False):
+    """ Esta função monta em segundo plano uma figura que ainda não está no cache
+
+        Usada para as visões que não estão na tela: quando o usuário trocar
+        de visão, a figura já está pronta. Nada é desenhado aqui. Só o
+        último estado dos filtros de cada sessão é montado: se a sessão muda
+        os filtros antes de o trabalho sair da fila, ele é descartado.
+
+        Input:
+            - func: função que monta a figura (ou o HTML, com html=True)
+            - load: função sem argumentos que retorna os dados de func; só é
+                    chamada na thread de segundo plano
+            - state: chave dos filtros (filter_state)
+            - args: demais argumentos de func, que também entram na chave
+            - html: True para funções que geram HTML (html_cached)
+        Output: None
+    """
+    cache = get_figure_cache()
+    key = _cache_key(func, state, *args)
+    ctx = get_script_run_ctx()
+    session = ctx.session_id if ctx is not None else None
+    with _prefetch_lock:
+        _prefetch_latest[session] = state
+        if key in _prefetch_pending or key in cache:
+            return
+        _prefetch_pending.add(key)
+
+    def build():
+        data = load()
+        return func(data, *args) if html else serialize_figure(func(data, *args))
+
+    def job():
+        try:
+            with _prefetch_lock:
+                # a mesma figura pode ter sido pedida por outra sessão com esses filtros
+                atual = state in _prefetch_latest.values()
+            if atual:
+                cache.get_or_build(key, build)
+        except Exception:
+            logger.exception('falha ao pré-carregar %s', func.__qualname__)
+        finally:
+            with _prefetch_lock:
+                _prefetch_pending.discard(key)
+                if not _prefetch_pending:
+                    # fila vazia: não há trabalho antigo para descartar
+                    _prefetch_latest.clear()
+
+    _prefetch_executor.submit(job)
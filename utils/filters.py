@@ -0,0 +1,63 @@
+# Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+
+from utils.dataset import register_aggregate
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def build_filter_index(df1):
+    """ Esta função monta o índice usado pelos filtros da barra lateral
+
+        O dataset já vem ordenado por Order_Date, então o filtro de data é uma
+        busca binária. Para o trânsito, guarda as posições (ordenadas) das
+        linhas de cada nível, e o multiselect vira uma união dessas posições.
+
+        Input: Dataframe limpo, ordenado por Order_Date
+        Output: dict com 'dates' (array datetime64) e 'traffic' (nível -> posições)
+    """
+    trafego = df1['Road_traffic_density'].cat
+    codes = trafego.codes.to_numpy()
+
+    # posições agrupadas por nível, em ordem crescente dentro de cada nível
+    ordem = np.argsort(codes, kind='stable')
+    limites = np.searchsorted(codes[ordem], np.arange(len(trafego.categories) + 1))
+    posicoes = {nivel: ordem[limites[i]:limites[i + 1]] for i, nivel in enumerate(trafego.categories)}
+
+    return {'dates': df1['Order_Date'].to_numpy(), 'traffic': posicoes}
+
+# o índice guarda posições de linha: é refeito quando o dataset recebe lotes novos
+register_aggregate('filter_index', build_filter_index, None)
+
+def filter_frame(df1, index, date_limit, traffic_options, columns=None):
+    """ Esta função aplica os filtros da barra lateral no dataset
+
+        Equivale a df1['Order_Date'] < date_limit seguido de
+        df1['Road_traffic_density'].isin(traffic_options), sem varrer as linhas.
+        Com todos os níveis de trânsito selecionados (o padrão) o resultado é
+        uma fatia (view) do dataset, sem cópia. Nos demais casos só as
+        colunas pedidas são copiadas para a sessão.
+
+        Input:
+            - df1: Dataframe limpo (o mesmo usado para montar o índice)
+            - index: resultado de build_filter_index(df1)
+            - date_limit: data limite (exclusiva)
+            - traffic_options: níveis de trânsito selecionados
+            - columns: colunas do resultado (padrão: todas)
+        Output: Dataframe filtrado (não deve ser alterado)
+    """
+    if columns is not None:
+        colunas = df1.columns.get_indexer(columns)
+    else:
+        colunas = slice(None)
+    fim = np.searchsorted(index['dates'], pd.Timestamp(date_limit).to_datetime64(), side='left')
+
+    niveis = index['traffic']
+    if all(nivel in traffic_options for nivel in niveis):
+        return df1.iloc[:fim, colunas]
+
+    partes = [posicoes[:np.searchsorted(posicoes, fim)] for nivel, posicoes in niveis.items() if nivel in traffic_options]
+    if not partes:
+        return df1.iloc[:0, colunas]
+    return df1.iloc[np.sort(np.concatenate(partes)), colunas]
@@ -0,0 +1,22 @@
+# Bibliotecas necessárias
+import numpy as np
+
+# Raio médio da Terra em km (mesmo valor usado pela biblioteca haversine)
+EARTH_RADIUS_KM = 6371.0088
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def haversine_np(lat1, lon1, lat2, lon2):
+    """ Esta função calcula a distância do grande círculo entre dois pontos
+
+        Versão vetorizada de haversine.haversine(): recebe colunas inteiras
+        (arrays ou Series) e calcula todas as distâncias de uma vez.
+
+        Input: latitudes e longitudes dos pontos de origem e destino, em graus
+        Output: array com as distâncias em km
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+
+    d = np.sin((lat2 - lat1) * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(d))
@@ -0,0 +1,54 @@
+# Bibliotecas necessárias
+import sys
+import time
+
+import pandas as pd
+
+from utils import snapshot
+from utils.dataset import DATASET_PATH, file_fingerprint, prepare_frame, source_version
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def append_batch(batch_path, path=DATASET_PATH, timings=None):
+    """ Esta função acrescenta um lote de pedidos novos ao dataset
+
+        Apenas o lote é lido e limpo; o resultado é gravado como um lote
+        incremental ao lado do snapshot do csv base. Os dashboards em execução
+        aplicam o lote (e atualizam os agregados) no próximo rerun. Um lote
+        com o mesmo conteúdo de um lote já aplicado é ignorado.
+
+        Input:
+            - batch_path: caminho do csv do lote, no mesmo formato do train.csv
+            - path: caminho do csv base
+            - timings: dict opcional que recebe o tempo (s) de cada etapa
+        Output: caminho do lote gravado, ou None se o lote já existia
+    """
+    if timings is None:
+        timings = {}
+
+    base_sha1 = source_version(path)
+    batch_sha1 = file_fingerprint(batch_path)
+    if any(sha1 == batch_sha1 for _, sha1 in snapshot.list_deltas(path, base_sha1)):
+        return None
+
+    inicio = time.perf_counter()
+    df = pd.read_csv(batch_path)
+    timings['leitura'] = time.perf_counter() - inicio
+
+    df1 = prepare_frame(df, timings)
+
+    inicio = time.perf_counter()
+    delta_path = snapshot.write_delta(df1, path, base_sha1, batch_sha1)
+    timings['gravacao'] = time.perf_counter() - inicio
+    return delta_path
+
+if __name__ == '__main__':
+    # Uso: python -m utils.ingest lote.csv [lote2.csv ...]
+    for batch_path in sys.argv[1:]:
+        timings = {}
+        delta_path = append_batch(batch_path, timings=timings)
+        if delta_path is None:
+            print(f'{batch_path}: lote já aplicado, ignorado')
+            continue
+        print(f'{batch_path} -> {delta_path} ({sum(timings.values()):.3f}s)')
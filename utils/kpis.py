@@ -0,0 +1,113 @@
+# Bibliotecas necessárias
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Estatística -> coluna do resultado de rollup() ('{}' recebe o campo)
+_ROLLUP_COLUMNS = {
+    'count': 'entregas',
+    'mean': 'avg_{}',
+    'std': 'std_{}',
+    'min': 'min_{}',
+    'max': 'max_{}',
+}
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+@dataclass(frozen=True)
+class KPI:
+    """ Declaração de um indicador
+
+        - name: nome do indicador no resultado
+        - stat: 'count', 'mean', 'std', 'min', 'max' (calculados por rollup)
+                ou 'nunique' (valores distintos nas linhas filtradas) ou
+                'quantile' (percentil do tempo de entrega, por quantiles())
+        - field: medida do cubo (MEASURES) para mean/std, extremo (EXTREMES)
+                 para min/max, coluna do dataset para nunique, ou o
+                 percentil ('p50', 'p90', ...) para quantile
+        - where: condição (dimensão, valor) opcional, por exemplo ('Festival', 'Yes')
+        - decimals: casas decimais do resultado (None = sem arredondar)
+    """
+    name: str
+    stat: str
+    field: Optional[str] = None
+    where: Optional[Tuple[str, str]] = None
+    decimals: Optional[int] = None
+
+# Indicadores do topo da página de restaurantes
+RESTAURANT_KPIS = [
+    KPI('entregadores', 'nunique', 'Delivery_person_ID'),
+    KPI('distancia_media', 'mean', 'distance', decimals=2),
+    KPI('tempo_medio_festival', 'mean', 'time', where=('Festival', 'Yes'), decimals=2),
+    KPI('tempo_std_festival', 'std', 'time', where=('Festival', 'Yes'), decimals=2),
+    KPI('tempo_medio_sem_festival', 'mean', 'time', where=('Festival', 'No'), decimals=2),
+    KPI('tempo_std_sem_festival', 'std', 'time', where=('Festival', 'No'), decimals=2),
+    KPI('tempo_p50', 'quantile', 'p50', decimals=1),
+    KPI('tempo_p90', 'quantile', 'p90', decimals=1),
+    KPI('tempo_p99', 'quantile', 'p99', decimals=1),
+]
+
+# Indicadores do topo da página de entregadores
+DELIVERY_KPIS = [
+    KPI('maior_idade', 'max', 'age'),
+    KPI('menor_idade', 'min', 'age'),
+    KPI('melhor_condicao', 'max', 'vehicle'),
+    KPI('pior_condicao', 'min', 'vehicle'),
+]
+
+def _to_python(valor, decimals):
+    if valor is None or pd.isna(valor):
+        return None
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if decimals is not None:
+        valor = round(float(valor), decimals)
+    return valor
+
+def compute_kpis(kpis, consulta):
+    """ Esta função calcula uma lista de indicadores de uma só vez
+
+        Os indicadores são agrupados pela dimensão da condição (where): para
+        cada dimensão é feito um único rollup, com todas as medidas e
+        extremos pedidos, e cada indicador só lê a sua célula.
+
+        Input:
+            - kpis: lista de KPI
+            - consulta: objeto de consultas já filtrado (utils.query.query_backend)
+        Output: dict nome -> valor (int ou float; None quando não há dados)
+    """
+    grupos = {}
+    for kpi in kpis:
+        grupos.setdefault(kpi.where[0] if kpi.where else None, []).append(kpi)
+
+    resultado = {}
+    for dim, lista in grupos.items():
+        measures = tuple(sorted({kpi.field for kpi in lista if kpi.stat in ('mean', 'std')}))
+        extremes = tuple(sorted({kpi.field for kpi in lista if kpi.stat in ('min', 'max')}))
+
+        tabela = None
+        if any(kpi.stat in _ROLLUP_COLUMNS for kpi in lista):
+            tabela = consulta.rollup([dim] if dim else [], measures, extremes)
+            tabela = tabela.set_index(dim) if dim else tabela
+
+        quantis = tuple(sorted({float(kpi.field[1:]) / 100 for kpi in lista if kpi.stat == 'quantile'}))
+        if quantis:
+            percentis = consulta.quantiles([dim] if dim else [], quantis)
+            percentis = percentis.set_index(dim) if dim else percentis
+
+        for kpi in lista:
+            if kpi.stat == 'nunique':
+                valor = consulta.nunique(kpi.field, kpi.where)
+            elif kpi.stat == 'quantile':
+                linha = kpi.where[1] if dim else 0
+                valor = percentis.at[linha, kpi.field] if linha in percentis.index else None
+            else:
+                linha = kpi.where[1] if dim else 0
+                coluna = _ROLLUP_COLUMNS[kpi.stat].format(kpi.field)
+                valor = tabela.at[linha, coluna] if linha in tabela.index else None
+            resultado[kpi.name] = _to_python(valor, kpi.decimals)
+
+    return resultado
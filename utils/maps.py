@@ -0,0 +1,135 @@
+# Bibliotecas necessárias
+import folium
+import numpy as np
+import pandas as pd
+from folium.plugins import FastMarkerCluster, HeatMap
+
+from utils.dataset import load_state, merge_cells, register_aggregate
+
+# Tamanho da célula da grade espacial, em graus (~5 km)
+GRID_DEGREES = 0.05
+
+# Máximo de pontos de cada tipo enviados ao navegador
+MAX_MAP_POINTS = 2000
+
+# Tipos de ponto: nome -> (coluna de latitude, coluna de longitude)
+POINT_KINDS = {
+    'entrega': ('Delivery_location_latitude', 'Delivery_location_longitude'),
+    'restaurante': ('Restaurant_latitude', 'Restaurant_longitude'),
+}
+
+# Dimensões da grade (data e trânsito para os filtros da barra lateral)
+GRID_KEYS = ['Order_Date', 'Road_traffic_density', 'kind', 'lat_bin', 'lon_bin']
+GRID_STATS = ['pontos', 'lat_sum', 'lon_sum']
+
+# Colunas do dataset lidas por build_geo_grid
+GRID_COLUMNS = ['Order_Date', 'Road_traffic_density'] + [col for cols in POINT_KINDS.values() for col in cols]
+
+# Marcador com a quantidade de entregas da célula no popup
+_CLUSTER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup(row[2] + ' pedidos');
+    return marker;
+}
+"""
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def build_geo_grid(df1):
+    """ Esta função pré-agrega as coordenadas de entrega e de restaurante em uma grade
+
+        Cada célula (dia x trânsito x tipo de ponto x célula da grade) guarda
+        a quantidade de pontos e a soma das latitudes e longitudes, para
+        desenhar o ponto no centro de massa da célula. Como o cubo, as
+        células podem ser somadas para qualquer filtro.
+
+        Input: Dataframe limpo
+        Output: Dataframe com GRID_KEYS + GRID_STATS, ordenado pela data
+    """
+    partes = []
+    for kind, (lat_col, lon_col) in POINT_KINDS.items():
+        lat = df1[lat_col].to_numpy(dtype=np.float64)
+        lon = df1[lon_col].to_numpy(dtype=np.float64)
+        partes.append(pd.DataFrame({
+            'Order_Date': df1['Order_Date'],
+            'Road_traffic_density': df1['Road_traffic_density'],
+            'kind': pd.Categorical([kind] * len(df1), categories=list(POINT_KINDS)),
+            'lat_bin': np.floor(lat / GRID_DEGREES).astype(np.int32),
+            'lon_bin': np.floor(lon / GRID_DEGREES).astype(np.int32),
+            'pontos': np.ones(len(df1), dtype=np.int64),
+            'lat_sum': lat,
+            'lon_sum': lon,
+        }))
+
+    grid = pd.concat(partes, ignore_index=True).groupby(GRID_KEYS, observed=True).sum().reset_index()
+    return grid.sort_values('Order_Date', kind='stable').reset_index(drop=True)
+
+def merge_geo_grids(grid, grid_batch):
+    """ Junta a grade atual com a grade de um lote novo (somando as células repetidas) """
+    return merge_cells(grid, grid_batch, GRID_KEYS,
+                       lambda celulas: celulas.groupby(GRID_KEYS, observed=True)[GRID_STATS].sum().reset_index())
+
+register_aggregate('geo_grid', build_geo_grid, merge_geo_grids, columns=GRID_COLUMNS)
+
+def load_geo_grid(dados=None):
+    """ Retorna a grade espacial de uma DatasetView (por padrão, a versão atual do dataset) """
+    if dados is None:
+        dados = load_state()
+    return dados.aggregate('geo_grid')
+
+def map_points(grid1, kind, max_points=MAX_MAP_POINTS):
+    """ Esta função soma a grade filtrada em pontos para o mapa
+
+        Se houver mais células do que max_points, a grade é engrossada
+        (células 2x maiores a cada passo) até caber, o que limita o tamanho
+        do mapa enviado ao navegador qualquer que seja o volume de dados.
+
+        Input:
+            - grid1: grade já filtrada
+            - kind: tipo de ponto (POINT_KINDS)
+            - max_points: quantidade máxima de pontos
+        Output: Dataframe com lat, lon (centro de massa) e pontos
+    """
+    df_aux = grid1.loc[grid1['kind'] == kind, ['lat_bin', 'lon_bin'] + GRID_STATS]
+    df_aux = df_aux.groupby(['lat_bin', 'lon_bin']).sum()
+    while len(df_aux) > max_points:
+        bins = df_aux.index.to_frame(index=False) // 2
+        df_aux = df_aux.set_axis(pd.MultiIndex.from_frame(bins)).groupby(level=[0, 1]).sum()
+
+    return pd.DataFrame({
+        'lat': df_aux['lat_sum'] / df_aux['pontos'],
+        'lon': df_aux['lon_sum'] / df_aux['pontos'],
+        'pontos': df_aux['pontos'],
+    }).reset_index(drop=True)
+
+def build_map_html(grid1, mode):
+    """ Esta função desenha o mapa de entregas e restaurantes a partir da grade
+
+        Input:
+            - grid1: grade já filtrada
+            - mode: 'cluster' (marcadores agrupados) ou 'heatmap' (mapa de calor)
+        Output: HTML do mapa, pronto para streamlit.components.v1.html
+    """
+    camadas = {kind: map_points(grid1, kind) for kind in POINT_KINDS}
+
+    pontos = pd.concat(camadas.values())
+    if len(pontos):
+        centro = [np.average(pontos['lat'], weights=pontos['pontos']), np.average(pontos['lon'], weights=pontos['pontos'])]
+        map = folium.Map(location=centro, zoom_start=5)
+    else:
+        map = folium.Map()
+
+    for kind, df_aux in camadas.items():
+        dados = df_aux[['lat', 'lon', 'pontos']].to_numpy().tolist()
+        if mode == 'heatmap':
+            if dados:
+                maximo = df_aux['pontos'].max()
+                dados = [[lat, lon, n / maximo] for lat, lon, n in dados]
+            HeatMap(dados, name=kind.capitalize(), show=(kind == 'entrega')).add_to(map)
+        else:
+            FastMarkerCluster(dados, callback=_CLUSTER_CALLBACK, name=kind.capitalize(), show=(kind == 'entrega')).add_to(map)
+
+    folium.LayerControl().add_to(map)
+    return folium.Figure().add_child(map).render()
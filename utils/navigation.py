@@ -0,0 +1,25 @@
+# Bibliotecas necessárias
+import os
+
+import streamlit as st
+
+# Pré-carregamento, em segundo plano, das figuras das visões que não estão na tela.
+# Desligado por padrão: cada rerun calcularia todas as visões escondidas.
+PREFETCH_VIEWS = os.environ.get('CURRY_PREFETCH', '0') == '1'
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def lazy_tabs(labels, key):
+    """ Esta função desenha a navegação entre as visões de uma página
+
+        Ao contrário do st.tabs, que executa o conteúdo de todas as abas a
+        cada rerun, só a visão escolhida é executada pela página; a troca de
+        visão faz um novo rerun.
+
+        Input:
+            - labels: nomes das visões
+            - key: chave do widget (guarda a visão escolhida na sessão)
+        Output: nome da visão escolhida
+    """
+    return st.radio('Visão', labels, horizontal=True, key=key, label_visibility='collapsed')
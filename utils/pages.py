@@ -0,0 +1,41 @@
+# Bibliotecas necessárias
+import ast
+import os
+from types import SimpleNamespace
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def _is_constant(node):
+    if not isinstance(node, ast.Assign):
+        return False
+    try:
+        ast.literal_eval(node.value)
+    except ValueError:
+        return False
+    return all(isinstance(alvo, ast.Name) for alvo in node.targets)
+
+def load_page_functions(path):
+    """ Esta função carrega as funções de uma página sem executar o streamlit
+
+        As páginas são scripts: importá-las desenharia a página inteira. Aqui
+        apenas os imports e as definições (def/class) do arquivo são
+        executados, junto com as constantes simples (NOME = literal); a barra
+        lateral e o layout ficam de fora.
+
+        Input: caminho do arquivo da página (por exemplo, 'pages/1_visao_empresa.py')
+        Output: SimpleNamespace com as funções definidas na página
+    """
+    path = os.path.abspath(path)
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+
+    definicoes = (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)
+    body = [node for node in tree.body if isinstance(node, definicoes) or _is_constant(node)]
+
+    namespace = {'__name__': os.path.splitext(os.path.basename(path))[0], '__file__': path}
+    exec(compile(ast.Module(body=body, type_ignores=[]), path, 'exec'), namespace)
+
+    funcoes = {nome: valor for nome, valor in namespace.items()
+               if callable(valor) and getattr(valor, '__module__', None) == namespace['__name__']}
+    return SimpleNamespace(**funcoes)
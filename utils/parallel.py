@@ -0,0 +1,120 @@
+# Bibliotecas necessárias
+import contextlib
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+# Processos usados nas agregações (CURRY_WORKERS=1 desliga o pool)
+PARALLEL_WORKERS = int(os.environ.get('CURRY_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Mínimo de linhas para a agregação usar o pool; abaixo dele ela roda no
+# próprio processo. Desligado por padrão (None): nenhum ganho sobre a execução
+# serial foi medido (veja o README). CURRY_PARALLEL_MIN_ROWS=500000 liga o pool
+# para datasets a partir desse tamanho.
+PARALLEL_MIN_ROWS = int(os.environ['CURRY_PARALLEL_MIN_ROWS']) if os.environ.get('CURRY_PARALLEL_MIN_ROWS') else None
+
+# Pool de processos do servidor, criado no primeiro uso
+_executor = None
+_executor_lock = threading.Lock()
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def _get_executor(workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None or _executor._max_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # forkserver: o servidor do streamlit tem várias threads, e um fork
+            # direto delas pode herdar locks travados
+            metodos = multiprocessing.get_all_start_methods()
+            contexto = multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=contexto)
+        return _executor
+
+@contextlib.contextmanager
+def _hidden_main():
+    # o streamlit instala a página como módulo __main__ (com __file__), e os
+    # processos forkserver/spawn reimportam o __main__ ao iniciar: sem isso
+    # cada processo do pool rodaria a página de novo. Os processos são
+    # iniciados dentro de submit(), então basta esconder o __main__ ali.
+    principal = sys.modules.get('__main__')
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = principal
+
+def partition_by_date(df1, parts):
+    """ Esta função divide o dataset, ordenado por Order_Date, em partições de dias inteiros
+
+        Cada dia fica numa única partição, e as partições estão em ordem de
+        data: os agregados parciais têm dias disjuntos e crescentes e são
+        juntados pelo caminho rápido (só acrescentar) dos merges.
+
+        Input:
+            - df1: Dataframe limpo, ordenado por Order_Date
+            - parts: quantidade desejada de partições
+        Output: lista de Dataframes (fatias de df1)
+    """
+    datas = df1['Order_Date'].to_numpy()
+    alvos = np.linspace(0, len(df1), parts + 1).astype(np.int64)[1:-1]
+    # cada corte é levado para o início do dia em que cairia
+    cortes = np.unique(np.searchsorted(datas, datas[np.minimum(alvos, len(df1) - 1)], side='left'))
+    limites = [0] + [int(c) for c in cortes if 0 < c < len(df1)] + [len(df1)]
+    return [df1.iloc[inicio:fim] for inicio, fim in zip(limites[:-1], limites[1:])]
+
+def _build_partition(parte, builds):
+    # tarefa de um processo do pool: todos os agregados de uma partição
+    return {name: build(parte) for name, build in builds.items()}
+
+def partitioned_aggregates(df1, aggregates, workers=None, min_rows=PARALLEL_MIN_ROWS):
+    """ Esta função calcula agregados juntáveis em paralelo, por partições de datas
+
+        O dataset é dividido em partições de dias inteiros e cada partição vai
+        uma única vez para o pool, só com as colunas que os agregados leem;
+        uma tarefa calcula todos os agregados da sua partição e os parciais
+        são juntados em ordem com merge(). Entradas pequenas, um único
+        processo ou um pool quebrado fazem os build() rodarem direto no
+        processo atual.
+
+        Input:
+            - df1: Dataframe limpo, ordenado por Order_Date
+            - aggregates: dict nome -> (build, merge, colunas lidas por build ou None para todas);
+                          build deve ser uma função de módulo (para ir aos processos)
+            - workers: quantidade de processos (padrão PARALLEL_WORKERS)
+            - min_rows: mínimo de linhas para usar o pool (None: nunca usa)
+        Output: dict nome -> agregado de df1
+    """
+    workers = PARALLEL_WORKERS if workers is None else workers
+    paralelo = workers > 1 and min_rows is not None and len(df1) >= min_rows and aggregates
+    partes = partition_by_date(df1, workers) if paralelo else [df1]
+    if len(partes) == 1:
+        return _build_partition(df1, {name: build for name, (build, _, _) in aggregates.items()})
+
+    colunas = [aggregate[2] for aggregate in aggregates.values()]
+    if all(cols is not None for cols in colunas):
+        necessarias = set().union(*colunas)
+        partes = [parte[[col for col in df1.columns if col in necessarias]] for parte in partes]
+
+    builds = {name: build for name, (build, _, _) in aggregates.items()}
+    try:
+        with _hidden_main():
+            futuros = [_get_executor(workers).submit(_build_partition, parte, builds) for parte in partes]
+        parciais = [futuro.result() for futuro in futuros]
+    except (BrokenProcessPool, OSError):
+        # sem processos disponíveis (ex.: ambiente sem fork/semáforos): roda no processo atual
+        return _build_partition(df1, builds)
+
+    resultado = parciais[0]
+    for parcial in parciais[1:]:
+        for name, (_, merge, _) in aggregates.items():
+            resultado[name] = merge(resultado[name], parcial[name])
+    return resultado
@@ -0,0 +1,213 @@
+# Bibliotecas necessárias
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Variável de ambiente que liga o perfil (e o log JSON) em todas as sessões
+PROFILE_ENV = 'CURRY_PROFILE'
+
+# Variável de ambiente que liga o tracemalloc nos perfis. O tracemalloc é do
+# processo todo e cada etapa zera o pico (reset_peak) das outras sessões, então
+# só deve ser ligado para depurar com uma sessão, nunca num servidor com várias
+TRACEMALLOC_ENV = 'CURRY_TRACEMALLOC'
+
+# Chave do checkbox do painel de depuração na barra lateral
+DEBUG_KEY = 'debug_panel'
+
+logger = logging.getLogger('curry_company.profile')
+
+# Perfil do rerun em andamento em cada thread (o streamlit roda cada rerun numa thread)
+_current = threading.local()
+
+# tracemalloc é do processo inteiro: fica ligado enquanto houver algum perfil ativo que o use
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def _acquire_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracemalloc_users += 1
+
+def _release_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+def _log_handler():
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+def max_rss_bytes():
+    """ Pico de memória residente (RSS) do processo, em bytes, ou None se indisponível """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def current_rss_bytes():
+    """ Memória residente (RSS) atual do processo, em bytes, ou None se indisponível (fora do Linux) """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+class RerunProfile:
+    """ Tempos, linhas e memória de cada etapa de um rerun de página
+
+        Cada etapa é medida com profile.stage(nome). A memória é a variação
+        do RSS do processo durante a etapa, lida sem alterar nenhum estado
+        global (com várias sessões ao mesmo tempo ela inclui as alocações das
+        outras). Com CURRY_TRACEMALLOC=1 o pico de alocações de cada etapa
+        também é medido pelo tracemalloc.
+    """
+
+    # campos caros de calcular (ex.: 'rows') só são medidos com o perfil ligado
+    enabled = True
+
+    def __init__(self, page, panel=False, trace=None):
+        self.page = page
+        self.panel = panel
+        self.trace = os.environ.get(TRACEMALLOC_ENV) == '1' if trace is None else trace
+        self.stages = []
+        self._stack = []
+        self._inicio = time.perf_counter()
+        if self.trace:
+            _acquire_tracemalloc()
+            # libera o tracemalloc mesmo se o rerun for interrompido antes do finish()
+            self._release = weakref.finalize(self, _release_tracemalloc)
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """ Mede uma etapa; o dicionário retornado aceita campos extras (ex.: 'rows') """
+        record = {'stage': name, 'rows': rows}
+        rss_inicio = current_rss_bytes()
+        if self.trace:
+            atual, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            self._stack.append([atual, 0])
+        else:
+            self._stack.append(None)
+        inicio = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - inicio
+            rss_fim = current_rss_bytes()
+            record['rss_delta_bytes'] = rss_fim - rss_inicio if rss_inicio is not None and rss_fim is not None else None
+            medida = self._stack.pop()
+            if medida is not None:
+                base, pico_interno = medida
+                pico = max(tracemalloc.get_traced_memory()[1], pico_interno)
+                record['peak_bytes'] = pico - base
+                if self._stack:
+                    # o reset_peak desta etapa apagou o pico da etapa de fora
+                    self._stack[-1][1] = max(self._stack[-1][1], pico)
+            record['depth'] = len(self._stack)
+            self.stages.append(record)
+
+    def add_timings(self, prefix, timings):
+        """ Registra tempos já medidos (ex.: os timings de clean_code) como etapas """
+        for name, seconds in timings.items():
+            self.stages.append({'stage': f'{prefix}.{name}', 'rows': None, 'seconds': seconds,
+                                'rss_delta_bytes': None, 'depth': len(self._stack) + 1})
+
+    def finish(self):
+        """ Encerra o perfil: grava uma linha JSON no log e desenha o painel, se ligado """
+        from utils.figcache import get_figure_cache
+
+        report = {
+            'event': 'rerun_profile',
+            'page': self.page,
+            'timestamp': time.time(),
+            'total_seconds': time.perf_counter() - self._inicio,
+            'max_rss_bytes': max_rss_bytes(),
+            'tracemalloc': self.trace,
+            'stages': self.stages,
+            'figure_cache': get_figure_cache().stats(),
+        }
+        if self.trace:
+            self._release()
+        _current.profile = None
+
+        _log_handler()
+        logger.info(json.dumps(report))
+
+        if self.panel:
+            with st.sidebar.expander('Perfil do rerun', expanded=True):
+                st.caption(f"Total: {report['total_seconds'] * 1000:.1f} ms")
+                df_aux = pd.DataFrame(self.stages, columns=['stage', 'seconds', 'rows', 'rss_delta_bytes',
+                                                            'peak_bytes', 'depth', 'cache'])
+                df_aux['ms'] = (df_aux['seconds'] * 1000).round(2)
+                df_aux['rss_mib'] = (df_aux['rss_delta_bytes'].astype(float) / 2**20).round(2)
+                df_aux['peak_mib'] = (df_aux['peak_bytes'].astype(float) / 2**20).round(2)
+                colunas = ['stage', 'ms', 'rows', 'rss_mib'] + (['peak_mib'] if self.trace else []) + ['cache']
+                st.dataframe(df_aux[colunas], hide_index=True)
+                st.json(report['figure_cache'])
+        return report
+
+class _NullProfile:
+    """ Perfil desligado: todas as operações são vazias """
+
+    enabled = False
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        yield {}
+
+    def add_timings(self, prefix, timings):
+        pass
+
+    def finish(self):
+        return None
+
+_NULL_PROFILE = _NullProfile()
+
+def start_profile(page):
+    """ Esta função inicia o perfil do rerun de uma página
+
+        O perfil é ligado pelo checkbox do painel de depuração (st.session_state)
+        ou pela variável de ambiente CURRY_PROFILE=1. Desligado, retorna um
+        perfil vazio, sem custo de medição.
+
+        Input: nome da página
+        Output: RerunProfile ou perfil vazio
+    """
+    panel = bool(st.session_state.get(DEBUG_KEY, False))
+    if not panel and os.environ.get(PROFILE_ENV) != '1':
+        _current.profile = _NULL_PROFILE
+        return _NULL_PROFILE
+
+    _current.profile = RerunProfile(page, panel)
+    return _current.profile
+
+def current_profile():
+    """ Perfil do rerun em andamento nesta thread (vazio se não houver) """
+    return getattr(_current, 'profile', None) or _NULL_PROFILE
+
+def debug_toggle():
+    """ Desenha o checkbox do painel de depuração na barra lateral """
+    st.sidebar.checkbox('Painel de depuração', key=DEBUG_KEY)
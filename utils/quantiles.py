@@ -0,0 +1,99 @@
+# Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+
+from utils.dataset import merge_cells, register_aggregate
+
+# Dimensões das células dos histogramas de tempo de entrega
+QUANTILE_KEYS = ['Order_Date', 'City', 'Road_traffic_density', 'Festival']
+
+# Largura (minutos) das faixas do histograma. O tempo de entrega é um número
+# inteiro de minutos, então com faixas de 1 minuto os percentis são exatos;
+# para valores quaisquer o erro é menor que a largura da faixa.
+QUANTILE_BIN = 1.0
+
+# Percentis mostrados nas páginas
+QUANTILES = (0.5, 0.9, 0.99)
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def quantile_column(q):
+    """ Nome da coluna de um percentil no resultado (0.9 -> 'p90') """
+    return f'p{q * 100:g}'
+
+def build_time_histogram(df1, keys=QUANTILE_KEYS, column='Time_taken(min)'):
+    """ Esta função monta os histogramas do tempo de entrega por célula
+
+        Cada célula (dia x cidade x trânsito x festival) guarda quantas
+        entregas caíram em cada faixa de QUANTILE_BIN minutos, só para as
+        faixas ocupadas. Histogramas são juntados somando as faixas, então os
+        percentis de qualquer combinação de filtros saem deles, sem voltar às
+        linhas.
+
+        Input:
+            - df1: Dataframe limpo
+            - keys: dimensões das células (a primeira deve ser Order_Date)
+            - column: coluna com o tempo de entrega
+        Output: Dataframe com keys + 'faixa' + 'entregas', ordenado pela data
+    """
+    valores = df1[column].astype(np.float64)
+    validos = valores.notna().to_numpy()
+
+    celulas = df1.loc[:, keys] if validos.all() else df1.loc[validos, keys]
+    faixas = np.floor(valores.to_numpy()[validos] / QUANTILE_BIN).astype(np.int32)
+    celulas = celulas.assign(faixa=faixas, entregas=np.ones(len(faixas), dtype=np.int64))
+
+    hist = celulas.groupby(keys + ['faixa'], observed=True)['entregas'].sum().reset_index()
+    return hist.sort_values('Order_Date', kind='stable').reset_index(drop=True)
+
+def merge_time_histograms(hist, hist_batch, keys=QUANTILE_KEYS):
+    """ Junta os histogramas atuais com os de um lote novo (soma das faixas por célula) """
+    return merge_cells(hist, hist_batch, keys + ['faixa'],
+                       lambda celulas: celulas.groupby(keys + ['faixa'], observed=True)['entregas'].sum().reset_index())
+
+register_aggregate('time_hist', build_time_histogram, merge_time_histograms,
+                   columns=QUANTILE_KEYS + ['Time_taken(min)'])
+
+def histogram_quantiles(hist, by, quantiles=QUANTILES):
+    """ Esta função calcula percentis juntando os histogramas das células
+
+        Usa a mesma interpolação linear de np.quantile entre as duas
+        entregas vizinhas da posição (n - 1) * q, lendo o valor de cada
+        entrega pela soma acumulada das faixas.
+
+        Input:
+            - hist: histogramas (já filtrados) de build_time_histogram
+            - by: lista de dimensões (lista vazia = total geral)
+            - quantiles: percentis desejados, entre 0 e 1
+        Output: Dataframe com as dimensões, 'entregas' e uma coluna por
+                percentil (quantile_column). O total geral tem sempre uma
+                linha, mesmo sem entregas.
+    """
+    grupos = [hist[col] for col in by] + [hist['faixa']]
+    contagens = hist['entregas'].groupby(grupos, observed=True).sum()
+    faixas = contagens.index.get_level_values('faixa').to_numpy()
+    acumulado = np.cumsum(contagens.to_numpy())
+
+    # os grupos ficam contíguos e ordenados: a soma acumulada global localiza a faixa de cada entrega
+    if by:
+        por_grupo = hist['entregas'].groupby([hist[col] for col in by], observed=True).sum()
+        totais = por_grupo.to_numpy()
+        df_aux = por_grupo.index.to_frame(index=False)
+    else:
+        totais = acumulado[-1:] if len(acumulado) else np.zeros(1, dtype=np.int64)
+        df_aux = pd.DataFrame(index=[0])
+    inicio = np.cumsum(totais) - totais
+
+    df_aux['entregas'] = totais.astype(np.int64)
+    for q in quantiles:
+        posicao = (totais - 1) * q
+        vizinhos = np.stack([np.floor(posicao), np.ceil(posicao)], axis=1)
+        if len(faixas):
+            indices = np.searchsorted(acumulado, inicio[:, None] + vizinhos, side='right')
+            valores = faixas[np.minimum(indices, len(faixas) - 1)] * QUANTILE_BIN
+        else:
+            valores = np.full(vizinhos.shape, np.nan)
+        resultado = valores[:, 0] + (posicao - vizinhos[:, 0]) * (valores[:, 1] - valores[:, 0])
+        df_aux[quantile_column(q)] = np.where(totais > 0, resultado, np.nan)
+    return df_aux
@@ -0,0 +1,303 @@
+# Bibliotecas necessárias
+import os
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from utils import snapshot
+from utils.calendar_dim import BUCKETS, time_bucket
+from utils.cube import CUBE_KEYS, EXTREMES, MEASURES, filter_cube, rollup
+from utils.dataset import DATASET_PATH, source_version
+from utils.drivers import DRIVER_KEYS
+from utils.filters import filter_frame
+from utils.maps import GRID_DEGREES, GRID_STATS, POINT_KINDS
+from utils.quantiles import QUANTILE_KEYS, QUANTILES, histogram_quantiles, quantile_column
+from utils.sketches import SKETCH_COLUMNS, SKETCH_KEYS, estimate_distinct
+
+# Variável de ambiente com o backend padrão das consultas
+BACKEND_ENV = 'CURRY_BACKEND'
+BACKENDS = ('pandas', 'duckdb')
+
+# Variável de ambiente com o modo das contagens de distintos: 'sketch' (padrão) ou 'exact'
+DISTINCT_ENV = 'CURRY_DISTINCT'
+
+# Conjuntos de dados do pyarrow abertos, por arquivo (só leem o cabeçalho; os dados ficam no disco)
+_datasets = {}
+_datasets_lock = threading.Lock()
+
+# Conexões do duckdb por DatasetView: view -> {csv: (conexão, trava)}
+_connections = weakref.WeakKeyDictionary()
+_connections_lock = threading.Lock()
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+class PandasQuery:
+    """ Consultas das páginas respondidas pelos agregados em memória
+
+        Cada consulta usa o menor agregado que tem todas as dimensões
+        pedidas: o cubo de métricas, depois a tabela de entregadores. Os
+        filtros da barra lateral são aplicados uma única vez em cada
+        agregado usado.
+
+        Os entregadores distintos vêm dos sketches HyperLogLog (utils.sketches),
+        com custo que não cresce com as linhas; com exact=True (ou
+        CURRY_DISTINCT=exact) as contagens são exatas, para validação.
+    """
+
+    def __init__(self, dados, date_limit, traffic_options, exact=None):
+        self.dados = dados
+        self.date_limit = date_limit
+        self.traffic_options = list(traffic_options)
+        self.exact = os.environ.get(DISTINCT_ENV, 'sketch') == 'exact' if exact is None else exact
+        self._filtrados = {}
+
+    def _filtered(self, name):
+        if name not in self._filtrados:
+            self._filtrados[name] = filter_cube(self.dados.aggregate(name), self.date_limit, self.traffic_options)
+        return self._filtrados[name]
+
+    def rollup(self, by, measures=('time',), extremes=()):
+        """ Mesmo resultado de utils.cube.rollup, com os filtros da consulta """
+        for name, keys in (('cube', CUBE_KEYS), ('drivers', DRIVER_KEYS)):
+            if set(by) <= set(keys):
+                return rollup(self._filtered(name), list(by), measures, extremes)
+        raise ValueError(f'nenhum agregado tem as dimensões {list(by)}')
+
+    def quantiles(self, by, quantiles=QUANTILES):
+        """ Percentis do tempo de entrega por dimensões de QUANTILE_KEYS (utils.quantiles.histogram_quantiles) """
+        if not set(by) <= set(QUANTILE_KEYS):
+            raise ValueError(f'os histogramas de tempo não têm as dimensões {list(by)}')
+        return histogram_quantiles(self._filtered('time_hist'), list(by), quantiles)
+
+    def geo_grid(self):
+        """ Grade espacial do mapa (utils.maps) com os filtros da consulta """
+        return self._filtered('geo_grid')
+
+    def time_series(self, unit, distinct=None):
+        """ Entregas (e valores distintos de uma coluna, opcional) por período: 'day', 'week', 'isoweek' ou 'month' """
+        calendar = self.dados.aggregate('calendar')
+        por_dia = rollup(self._filtered('cube'), ['Order_Date'], measures=())
+        df_aux = (por_dia.groupby(time_bucket(por_dia['Order_Date'], unit, calendar))['entregas'].sum()
+                  .rename_axis('periodo').reset_index())
+
+        if distinct is not None and not self.exact and distinct in SKETCH_COLUMNS:
+            # sketches das células juntados por período
+            celulas = self._filtered('driver_sketches')
+            distintos = estimate_distinct(celulas, time_bucket(celulas['Order_Date'], unit, calendar))
+            df_aux[distinct] = distintos.reindex(df_aux['periodo']).to_numpy()
+        elif distinct is not None:
+            # cada entregador aparece na tabela de entregadores em todo dia em que fez entregas
+            name = 'cube' if distinct in CUBE_KEYS else 'drivers'
+            if distinct not in CUBE_KEYS + DRIVER_KEYS:
+                raise ValueError(f'nenhum agregado tem a coluna {distinct}')
+            celulas = self._filtered(name)
+            periodos = time_bucket(celulas['Order_Date'], unit, calendar)
+            distintos = celulas[distinct].groupby(periodos, observed=True).nunique()
+            df_aux[distinct] = distintos.reindex(df_aux['periodo']).to_numpy()
+        return df_aux
+
+    def nunique(self, column, where=None):
+        """ Quantidade de valores distintos de uma coluna nas linhas filtradas, com condição (dimensão, valor) opcional """
+        if not self.exact and column in SKETCH_COLUMNS and (where is None or where[0] in SKETCH_KEYS):
+            celulas = self._filtered('driver_sketches')
+            if where is not None:
+                celulas = celulas.loc[celulas[where[0]] == where[1], :]
+            return estimate_distinct(celulas)
+
+        # só as colunas usadas são filtradas; o dataset compartilhado não é copiado
+        columns = [column] if where is None else [column, where[0]]
+        df1 = filter_frame(self.dados.frame, self.dados.aggregate('filter_index'),
+                           self.date_limit, self.traffic_options, columns)
+        coluna = df1[column] if where is None else df1.loc[df1[where[0]] == where[1], column]
+        return coluna.nunique()
+
+def _quote(col):
+    return '"' + col.replace('"', '""') + '"'
+
+def _arrow_dataset(path):
+    import pyarrow.dataset as ds
+
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _datasets_lock:
+        if key not in _datasets:
+            _datasets[key] = ds.dataset(path, format='feather')
+        return _datasets[key]
+
+def _duckdb_connection(dados, path):
+    """ Esta função retorna a conexão do duckdb de uma DatasetView, aberta uma única vez por view
+
+        A conexão tem a view 'entregas' com o snapshot e os lotes já
+        aplicados na DatasetView, e é compartilhada por todas as consultas
+        (sessões) sobre essa versão do dataset. Quando a DatasetView é
+        substituída por uma versão nova e deixa de ser usada, a conexão é
+        fechada.
+
+        Input:
+            - dados: DatasetView
+            - path: caminho do csv de dados
+        Output: tupla (conexão, trava das consultas)
+    """
+    import duckdb
+
+    with _connections_lock:
+        por_csv = _connections.setdefault(dados, {})
+        if path not in por_csv:
+            con = duckdb.connect()
+            arquivos = [snapshot.snapshot_path(path)]
+            arquivos += [delta_path for delta_path, _ in snapshot.list_deltas(path, source_version(path))[:len(dados.applied)]]
+
+            partes = []
+            for i, arquivo in enumerate(arquivos):
+                con.register(f'parte_{i}', _arrow_dataset(arquivo))
+                partes.append(f'SELECT * FROM parte_{i}')
+            con.execute('CREATE TEMP VIEW entregas AS ' + ' UNION ALL BY NAME '.join(partes))
+
+            # a conexão do duckdb não aceita consultas simultâneas (sessões, pré-carregamento em segundo plano)
+            por_csv[path] = (con, threading.Lock())
+            weakref.finalize(dados, con.close)
+        return por_csv[path]
+
+class DuckDBQuery:
+    """ Consultas das páginas feitas com o DuckDB direto no snapshot colunar
+
+        O snapshot (e os lotes incrementais já aplicados na DatasetView) são
+        lidos pelo DuckDB como datasets do pyarrow: os filtros de data e de
+        trânsito e a lista de colunas são empurrados para a leitura do
+        arquivo, e o pandas só recebe o resultado agregado.
+    """
+
+    def __init__(self, dados, date_limit, traffic_options, path=DATASET_PATH):
+        # a conexão é da DatasetView; a consulta só guarda os filtros
+        self.con, self._lock = _duckdb_connection(dados, path)
+
+        self.params = [pd.Timestamp(date_limit).to_pydatetime()] + list(traffic_options)
+        marcadores = ', '.join('?' * len(traffic_options)) or 'NULL'
+        self.where = f'"Order_Date" < ? AND CAST("Road_traffic_density" AS VARCHAR) IN ({marcadores})'
+
+    def rollup(self, by, measures=('time',), extremes=()):
+        """ Mesmo resultado de utils.cube.rollup, calculado pelo DuckDB """
+        chaves = [f'CAST({_quote(col)} AS VARCHAR) AS {_quote(col)}' if col != 'Order_Date' else _quote(col) for col in by]
+        colunas = chaves + ['count(*) AS entregas']
+        for m in measures:
+            valor = f'CAST({_quote(MEASURES[m])} AS DOUBLE)'
+            filtro = f'FILTER (WHERE NOT isnan({valor}))'
+            colunas.append(f'avg({valor}) {filtro} AS avg_{m}')
+            colunas.append(f'stddev_samp({valor}) {filtro} AS std_{m}')
+        for e in extremes:
+            colunas.append(f'min({_quote(EXTREMES[e])}) AS min_{e}')
+            colunas.append(f'max({_quote(EXTREMES[e])}) AS max_{e}')
+
+        sql = f'SELECT {", ".join(colunas)} FROM entregas WHERE {self.where}'
+        if by:
+            grupos = ', '.join(str(i + 1) for i in range(len(by)))
+            sql += f' GROUP BY {grupos} ORDER BY {grupos}'
+        with self._lock:
+            df_aux = self.con.execute(sql, self.params).df()
+        df_aux['entregas'] = df_aux['entregas'].astype(np.int64)
+        return df_aux
+
+    def quantiles(self, by, quantiles=QUANTILES):
+        """ Mesmo resultado de PandasQuery.quantiles, com percentis exatos calculados pelo DuckDB """
+        chaves = [f'CAST({_quote(col)} AS VARCHAR) AS {_quote(col)}' if col != 'Order_Date' else _quote(col) for col in by]
+        tempo = _quote(MEASURES['time'])
+        colunas = chaves + [f'count({tempo}) AS entregas']
+        colunas += [f'quantile_cont({tempo}, {float(q)}) AS {quantile_column(q)}' for q in quantiles]
+
+        sql = f'SELECT {", ".join(colunas)} FROM entregas WHERE {self.where}'
+        if by:
+            grupos = ', '.join(str(i + 1) for i in range(len(by)))
+            sql += f' GROUP BY {grupos} ORDER BY {grupos}'
+        with self._lock:
+            df_aux = self.con.execute(sql, self.params).df()
+        df_aux['entregas'] = df_aux['entregas'].astype(np.int64)
+        return df_aux
+
+    def geo_grid(self):
+        """ Grade espacial do mapa calculada pelo DuckDB, com as células de utils.maps.build_geo_grid
+
+            Como o mapa não separa dias nem trânsito, as células já filtradas
+            são só tipo de ponto x célula da grade.
+        """
+        partes = []
+        for kind, (lat_col, lon_col) in POINT_KINDS.items():
+            lat, lon = f'CAST({_quote(lat_col)} AS DOUBLE)', f'CAST({_quote(lon_col)} AS DOUBLE)'
+            partes.append(f"SELECT '{kind}' AS kind, CAST(floor({lat} / {GRID_DEGREES!r}) AS INTEGER) AS lat_bin, "
+                          f'CAST(floor({lon} / {GRID_DEGREES!r}) AS INTEGER) AS lon_bin, count(*) AS pontos, '
+                          f'sum({lat}) AS lat_sum, sum({lon}) AS lon_sum FROM entregas WHERE {self.where} GROUP BY 2, 3')
+        sql = ' UNION ALL '.join(partes) + ' ORDER BY 1, 2, 3'
+        with self._lock:
+            df_aux = self.con.execute(sql, self.params * len(partes)).df()
+        df_aux['pontos'] = df_aux['pontos'].astype(np.int64)
+        return df_aux.loc[:, ['kind', 'lat_bin', 'lon_bin'] + GRID_STATS]
+
+    def time_series(self, unit, distinct=None):
+        """ Mesmo resultado de PandasQuery.time_series, calculado pelo DuckDB """
+        if unit not in BUCKETS:
+            raise ValueError(f'período desconhecido: {unit} (opções: {", ".join(BUCKETS)})')
+        dia = 'CAST(CAST("Order_Date" AS TIMESTAMP) AS DATE)'
+        periodo = {
+            'day': dia,
+            'week': f'{dia} - CAST(dayofweek({dia}) AS INTEGER)',
+            'isoweek': f"date_trunc('week', {dia})",
+            'month': f"date_trunc('month', {dia})",
+        }[unit]
+
+        colunas = [f'{periodo} AS periodo', 'count(*) AS entregas']
+        if distinct is not None:
+            colunas.append(f'count(DISTINCT {_quote(distinct)}) AS {_quote(distinct)}')
+        sql = f'SELECT {", ".join(colunas)} FROM entregas WHERE {self.where} GROUP BY 1 ORDER BY 1'
+        with self._lock:
+            df_aux = self.con.execute(sql, self.params).df()
+        df_aux['periodo'] = df_aux['periodo'].astype('datetime64[ns]')
+        df_aux['entregas'] = df_aux['entregas'].astype(np.int64)
+        return df_aux
+
+    def nunique(self, column, where=None):
+        """ Quantidade de valores distintos de uma coluna nas linhas filtradas, com condição (dimensão, valor) opcional """
+        sql = f'SELECT count(DISTINCT {_quote(column)}) FROM entregas WHERE {self.where}'
+        params = list(self.params)
+        if where is not None:
+            sql += f' AND CAST({_quote(where[0])} AS VARCHAR) = ?'
+            params.append(where[1])
+        with self._lock:
+            return self.con.execute(sql, params).fetchone()[0]
+
+def dataset_rows(dados, backend=None, path=DATASET_PATH):
+    """ Esta função retorna a quantidade de linhas de uma versão do dataset
+
+        No backend pandas vem do cubo (DatasetView.rows); no duckdb é um
+        count(*) no snapshot, sem carregar o dataset nem os agregados.
+
+        Input: DatasetView, backend (padrão: variável CURRY_BACKEND) e caminho do csv de dados
+        Output: int
+    """
+    backend = backend or os.environ.get(BACKEND_ENV, 'pandas')
+    if backend == 'duckdb':
+        con, lock = _duckdb_connection(dados, path)
+        with lock:
+            return int(con.execute('SELECT count(*) FROM entregas').fetchone()[0])
+    return dados.rows
+
+def query_backend(dados, date_limit, traffic_options, backend=None, path=DATASET_PATH, exact=None):
+    """ Esta função cria o objeto de consultas das páginas para os filtros da barra lateral
+
+        Input:
+            - dados: DatasetView (load_state())
+            - date_limit: data limite do filtro
+            - traffic_options: níveis de trânsito selecionados
+            - backend: 'pandas' ou 'duckdb' (padrão: variável CURRY_BACKEND, ou 'pandas')
+            - path: caminho do csv de dados (o duckdb lê o snapshot correspondente)
+            - exact: contagens de distintos exatas no pandas (padrão: variável CURRY_DISTINCT);
+                     o duckdb lê as linhas e sempre conta exatamente
+        Output: PandasQuery ou DuckDBQuery, ambos com rollup(), quantiles(), geo_grid(), time_series() e nunique()
+    """
+    backend = backend or os.environ.get(BACKEND_ENV, 'pandas')
+    if backend == 'pandas':
+        return PandasQuery(dados, date_limit, traffic_options, exact)
+    if backend == 'duckdb':
+        return DuckDBQuery(dados, date_limit, traffic_options, path)
+    raise ValueError(f'backend desconhecido: {backend} (opções: {", ".join(BACKENDS)})')
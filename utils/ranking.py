@@ -0,0 +1,66 @@
+# Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def _select(valores, posicoes, k):
+    """ Posições dos k menores valores, em ordem crescente
+
+        np.partition acha o k-ésimo valor sem ordenar o grupo inteiro; só os
+        candidatos (os k menores e os empatados com o k-ésimo) são ordenados,
+        com desempate pela posição da linha.
+    """
+    if len(valores) > k:
+        limite = np.partition(valores, k - 1)[k - 1]
+        candidatos = np.flatnonzero(valores <= limite)
+    else:
+        candidatos = np.arange(len(valores))
+    ordem = np.lexsort((posicoes[candidatos], valores[candidatos]))[:k]
+    return posicoes[candidatos[ordem]]
+
+def rank_per_group(df_aux, group, metric, k=10, count=None, min_count=1):
+    """ Esta função seleciona as k menores e as k maiores linhas de cada grupo
+
+        Os grupos são detectados nos próprios dados (uma cidade nova aparece
+        sem mudar o código) e listados do maior para o menor em quantidade de
+        entregas. Cada grupo passa por uma seleção parcial, sem ordenar a
+        tabela inteira.
+
+        Input:
+            - df_aux: Dataframe já agregado, uma linha por entidade do ranking
+            - group: coluna do grupo (ex.: 'City')
+            - metric: coluna usada no ranking (ex.: 'Time_taken(min)')
+            - k: quantidade de linhas por grupo
+            - count: coluna com a quantidade de entregas de cada linha (opcional)
+            - min_count: linhas com menos entregas que isso ficam fora do ranking
+        Output: tupla (menores, maiores) de Dataframes, com as colunas de df_aux
+    """
+    valido = df_aux[metric].notna().to_numpy()
+    if count is not None:
+        valido &= (df_aux[count] >= min_count).to_numpy()
+    df_aux = df_aux.loc[valido, :]
+    if k <= 0 or df_aux.empty:
+        return df_aux.iloc[:0].reset_index(drop=True), df_aux.iloc[:0].reset_index(drop=True)
+
+    codes, grupos = pd.factorize(df_aux[group], sort=True)
+    valores = df_aux[metric].to_numpy(dtype=float)
+
+    # ordem dos grupos: mais entregas primeiro, empate pelo nome
+    pesos = df_aux[count].to_numpy() if count is not None else None
+    tamanhos = np.bincount(codes, weights=pesos, minlength=len(grupos))
+    ordem_grupos = np.lexsort((np.arange(len(grupos)), -tamanhos))
+
+    # linhas de cada grupo contíguas: ordenação estável pelos códigos inteiros
+    por_grupo = np.argsort(codes, kind='stable')
+    limites = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(grupos)))])
+
+    menores, maiores = [], []
+    for g in ordem_grupos:
+        posicoes = por_grupo[limites[g]:limites[g + 1]]
+        menores.append(_select(valores[posicoes], posicoes, k))
+        maiores.append(_select(-valores[posicoes], posicoes, k))
+
+    return (df_aux.iloc[np.concatenate(menores)].reset_index(drop=True),
+            df_aux.iloc[np.concatenate(maiores)].reset_index(drop=True))
@@ -0,0 +1,245 @@
+# Bibliotecas necessárias
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+
+import pandas as pd
+import plotly.offline
+
+from utils.dataset import DATASET_PATH, load_process_state
+from utils.figcache import serialize_figure
+from utils.kpis import DELIVERY_KPIS, RESTAURANT_KPIS, compute_kpis
+from utils.pages import load_page_functions
+from utils.parallel import PARALLEL_WORKERS
+from utils.query import query_backend
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES_DIR = os.path.join(ROOT_DIR, 'pages')
+
+# Pasta padrão dos artefatos estáticos
+RENDER_DIR = os.path.join(ROOT_DIR, 'static')
+
+# Grade padrão: os filtros com que as páginas abrem
+TRAFFIC_LEVELS = ['Low', 'Medium', 'High', 'Jam']
+DEFAULT_DATES = [datetime(2022, 4, 13)]
+DEFAULT_TRAFFIC = [TRAFFIC_LEVELS]
+
+# Gráficos plotly gerados: (página, função, argumentos além da consulta)
+FIGURES = [
+    ('1_visao_empresa', 'order_metric', ()),
+    ('1_visao_empresa', 'traffic_order_share', ()),
+    ('1_visao_empresa', 'traffic_order_city', ()),
+    ('1_visao_empresa', 'order_by_week', ()),
+    ('1_visao_empresa', 'order_share_by_week', ()),
+    ('3_visao_restaurantes', 'distance', (True,)),
+    ('3_visao_restaurantes', 'avg_std_time_graph', ()),
+    ('3_visao_restaurantes', 'avg_std_time_on_traffic', ()),
+    ('3_visao_restaurantes', 'time_percentiles', ('City',)),
+    ('3_visao_restaurantes', 'time_percentiles', ('Road_traffic_density',)),
+    ('3_visao_restaurantes', 'time_percentiles', ('Festival',)),
+]
+
+# Modos do mapa da visão geográfica (utils.maps.build_map_html)
+MAP_MODES = ('cluster', 'heatmap')
+
+# Estado de cada processo de renderização (dataset e funções das páginas)
+_worker = {}
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def _tables(paginas, consulta):
+    # tabelas e indicadores das páginas, com os mesmos rollups do layout
+    rapidos, lentos = paginas['2_visao_entregadores'].top_delivers(consulta)
+    return {
+        'kpis_restaurantes': compute_kpis(RESTAURANT_KPIS, consulta),
+        'kpis_entregadores': compute_kpis(DELIVERY_KPIS, consulta),
+        'top_entregadores_rapidos': rapidos,
+        'top_entregadores_lentos': lentos,
+        'avaliacoes_entregador': consulta.rollup(['Delivery_person_ID'], measures=('rating',))
+                                         .loc[:, ['Delivery_person_ID', 'avg_rating']],
+        'avaliacoes_transito': consulta.rollup(['Road_traffic_density'], measures=('rating',))
+                                       .loc[:, ['Road_traffic_density', 'avg_rating', 'std_rating']],
+        'avaliacoes_clima': consulta.rollup(['Weatherconditions'], measures=('rating',))
+                                    .loc[:, ['Weatherconditions', 'avg_rating', 'std_rating']],
+        'tempo_cidade_pedido': consulta.rollup(['City', 'Type_of_order'])
+                                       .loc[:, ['City', 'Type_of_order', 'avg_time', 'std_time']],
+    }
+
+def render_id(date_limit, traffic_options):
+    """ Nome da pasta de uma combinação de filtros, por exemplo '2022-04-13_low-medium-high-jam' """
+    niveis = [nivel.lower() for nivel in TRAFFIC_LEVELS if nivel in traffic_options] or ['nenhum']
+    return f"{pd.Timestamp(date_limit):%Y-%m-%d}_{'-'.join(niveis)}"
+
+def _write(path, texto):
+    # grava num arquivo temporário e troca de uma vez: quem serve os arquivos nunca lê um artefato pela metade
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(texto)
+    os.replace(tmp_path, path)
+    return len(texto.encode('utf-8'))
+
+def _table_json(tabela):
+    if isinstance(tabela, pd.DataFrame):
+        tabela = tabela.astype({col: str for col in tabela.columns if isinstance(tabela[col].dtype, pd.CategoricalDtype)})
+        return tabela.to_json(orient='records', date_format='iso', force_ascii=False)
+    return json.dumps(tabela, ensure_ascii=False)
+
+def _init_worker(path):
+    _worker['path'] = path
+    _worker['paginas'] = {pagina: load_page_functions(os.path.join(PAGES_DIR, f'{pagina}.py'))
+                          for pagina in sorted({pagina for pagina, _, _ in FIGURES} | {'2_visao_entregadores'})}
+
+def render_filters(date_limit, traffic_options, output_dir):
+    """ Esta função gera os artefatos estáticos de uma combinação de filtros
+
+        Cada gráfico é gravado como HTML (com o plotly.js da pasta de saída)
+        e como JSON (a mesma especificação que o st.plotly_chart envia); os
+        mapas como HTML e as tabelas e indicadores como JSON.
+
+        Input:
+            - date_limit: data limite do filtro
+            - traffic_options: níveis de trânsito selecionados
+            - output_dir: pasta de saída (os arquivos vão para output_dir/render_id)
+        Output: dict com a descrição da combinação para o manifesto
+    """
+    if not _worker:
+        _init_worker(DATASET_PATH)
+    inicio = time.perf_counter()
+    dados = load_process_state(_worker['path'])
+    consulta = query_backend(dados, date_limit, traffic_options, path=_worker['path'])
+    paginas = _worker['paginas']
+
+    nome_pasta = render_id(date_limit, traffic_options)
+    pasta = os.path.join(output_dir, nome_pasta)
+    os.makedirs(pasta, exist_ok=True)
+
+    artefatos = []
+    for pagina, funcao, args in FIGURES:
+        fig = getattr(paginas[pagina], funcao)(consulta, *args)
+        nome = '-'.join([funcao] + [str(arg) for arg in args if not isinstance(arg, bool)])
+        html = fig.to_html(include_plotlyjs='../plotly.min.js', full_html=True)
+        artefatos.append({
+            'name': nome, 'page': pagina, 'kind': 'figure',
+            'html': f'{nome_pasta}/{nome}.html', 'json': f'{nome_pasta}/{nome}.json',
+            'bytes': _write(os.path.join(pasta, f'{nome}.html'), html)
+                     + _write(os.path.join(pasta, f'{nome}.json'), serialize_figure(fig)),
+        })
+
+    grid1 = consulta.geo_grid()
+    for modo in MAP_MODES:
+        nome = f'country_maps-{modo}'
+        html = paginas['1_visao_empresa'].country_maps(grid1, modo)
+        artefatos.append({'name': nome, 'page': '1_visao_empresa', 'kind': 'map', 'html': f'{nome_pasta}/{nome}.html',
+                          'bytes': _write(os.path.join(pasta, f'{nome}.html'), html)})
+
+    for nome, tabela in _tables(paginas, consulta).items():
+        artefatos.append({'name': nome, 'kind': 'table', 'json': f'{nome_pasta}/{nome}.json',
+                          'bytes': _write(os.path.join(pasta, f'{nome}.json'), _table_json(tabela))})
+
+    return {
+        'id': nome_pasta,
+        'date_limit': f'{pd.Timestamp(date_limit):%Y-%m-%d}',
+        'traffic_options': [nivel for nivel in TRAFFIC_LEVELS if nivel in traffic_options],
+        'dataset_version': dados.version,
+        'seconds': round(time.perf_counter() - inicio, 3),
+        'artifacts': artefatos,
+    }
+
+def _render_all(filtros, output_dir, path, workers):
+    if workers > 1 and len(filtros) > 1:
+        metodos = multiprocessing.get_all_start_methods()
+        contexto = multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=contexto,
+                                     initializer=_init_worker, initargs=(path,)) as executor:
+                futuros = [executor.submit(render_filters, date_limit, traffic_options, output_dir)
+                           for date_limit, traffic_options in filtros]
+                return [futuro.result() for futuro in futuros]
+        except (BrokenProcessPool, OSError):
+            # sem processos disponíveis: renderiza no processo atual
+            pass
+
+    _init_worker(path)
+    return [render_filters(date_limit, traffic_options, output_dir) for date_limit, traffic_options in filtros]
+
+def _index_html(manifesto):
+    linhas = [f"<h1>Curry Company - versão {manifesto['dataset_version'][:12]}</h1>"]
+    for render in manifesto['renders']:
+        links = ' · '.join(f"<a href=\"{artefato.get('html') or artefato['json']}\">{artefato['name']}</a>"
+                           for artefato in render['artifacts'])
+        linhas.append(f"<h2>{render['date_limit']} — {', '.join(render['traffic_options']) or 'nenhum'}</h2><p>{links}</p>")
+    return '<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>' + '\n'.join(linhas) + '</body></html>'
+
+def render_grid(dates=DEFAULT_DATES, traffic_sets=DEFAULT_TRAFFIC, output_dir=RENDER_DIR, path=DATASET_PATH,
+                workers=PARALLEL_WORKERS):
+    """ Esta função gera os artefatos estáticos para uma grade de filtros, sem o streamlit
+
+        Cada combinação (data limite, níveis de trânsito) é renderizada num
+        processo do pool. Ao final são gravados o manifest.json (combinações,
+        arquivos e versão do dataset) e um index.html com os links; os dois
+        são trocados só depois de todos os artefatos estarem gravados.
+
+        Input:
+            - dates: datas limite
+            - traffic_sets: listas de níveis de trânsito
+            - output_dir: pasta de saída
+            - path: caminho do csv de dados
+            - workers: quantidade de processos (1 renderiza no processo atual)
+        Output: dict do manifesto
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    inicio = time.perf_counter()
+    # carrega (e, se preciso, regrava o snapshot) uma vez antes de abrir os processos
+    dados = load_process_state(path)
+    _write(os.path.join(output_dir, 'plotly.min.js'), plotly.offline.get_plotlyjs())
+
+    filtros = list(itertools.product(dates, traffic_sets))
+    renders = _render_all(filtros, output_dir, path, workers)
+
+    manifesto = {
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'dataset_version': dados.version,
+        'plotlyjs': 'plotly.min.js',
+        'workers': workers,
+        'seconds': round(time.perf_counter() - inicio, 3),
+        'renders': renders,
+    }
+    _write(os.path.join(output_dir, 'manifest.json'), json.dumps(manifesto, indent=2, ensure_ascii=False))
+    _write(os.path.join(output_dir, 'index.html'), _index_html(manifesto))
+    return manifesto
+
+def _traffic_set(texto):
+    niveis = [nivel.strip() for nivel in texto.split(',') if nivel.strip()]
+    desconhecidos = set(niveis) - set(TRAFFIC_LEVELS)
+    if desconhecidos:
+        raise argparse.ArgumentTypeError(f'níveis de trânsito desconhecidos: {", ".join(sorted(desconhecidos))}')
+    return niveis
+
+if __name__ == '__main__':
+    # Uso: python -m utils.render [--dates 2022-04-13 2022-03-20] [--traffic Low,Medium,High,Jam Low,Jam] [--output static]
+    parser = argparse.ArgumentParser(description='Gera os gráficos e tabelas das páginas como arquivos estáticos')
+    parser.add_argument('--dates', nargs='+', type=datetime.fromisoformat, default=DEFAULT_DATES,
+                        help='datas limite (AAAA-MM-DD)')
+    parser.add_argument('--traffic', nargs='+', type=_traffic_set, default=DEFAULT_TRAFFIC,
+                        help='conjuntos de níveis de trânsito separados por vírgula')
+    parser.add_argument('--all-traffic', action='store_true', help='todos os conjuntos não vazios de níveis de trânsito')
+    parser.add_argument('--output', default=RENDER_DIR, help='pasta de saída (padrão: static/)')
+    parser.add_argument('--csv', default=DATASET_PATH, help='csv de dados')
+    parser.add_argument('--workers', type=int, default=PARALLEL_WORKERS)
+    args = parser.parse_args()
+
+    traffic_sets = args.traffic
+    if args.all_traffic:
+        traffic_sets = [list(niveis) for n in range(1, len(TRAFFIC_LEVELS) + 1)
+                        for niveis in itertools.combinations(TRAFFIC_LEVELS, n)]
+
+    manifesto = render_grid(args.dates, traffic_sets, args.output, args.csv, args.workers)
+    print(f"{len(manifesto['renders'])} combinações gravadas em {args.output} ({manifesto['seconds']:.1f}s)", file=sys.stderr)
@@ -0,0 +1,131 @@
+# Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+
+from utils.dataset import merge_cells, register_aggregate
+
+# Precisão dos sketches HyperLogLog: 2**12 registros, erro padrão de ~1,6%
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+
+# Dimensões das células dos sketches de entregadores
+SKETCH_KEYS = ['Order_Date', 'City', 'Road_traffic_density']
+
+# Colunas com sketch de valores distintos
+SKETCH_COLUMNS = ['Delivery_person_ID']
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def hash_values(valores):
+    """ Hash de 64 bits de cada valor, o mesmo em qualquer lote (categorias são
+        calculadas uma vez por categoria). Valores nulos ficam de fora.
+
+        Input: Series com os valores
+        Output: array uint64 com os hashes dos valores não nulos e a máscara desses valores
+    """
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        codes = valores.cat.codes.to_numpy()
+        validos = codes >= 0
+        categorias = pd.util.hash_array(valores.cat.categories.to_numpy(dtype=object))
+        return categorias[codes[validos]], validos
+
+    validos = valores.notna().to_numpy()
+    return pd.util.hash_array(valores.to_numpy(dtype=object)[validos]), validos
+
+def _bit_length(w):
+    # quantidade de bits significativos de cada inteiro, por busca binária vetorizada
+    bits = np.zeros(len(w), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        alto = w >> np.uint64(shift)
+        tem = alto != 0
+        bits[tem] += shift
+        w = np.where(tem, alto, w)
+    return bits + (w != 0)
+
+def hll_registers(hashes, precision=HLL_PRECISION):
+    """ Esta função calcula o registro e o posto (rank) HyperLogLog de cada hash
+
+        Os primeiros `precision` bits escolhem o registro; o posto é a posição
+        do primeiro bit 1 nos bits restantes.
+
+        Input: array uint64 de hashes
+        Output: arrays do registro (uint16) e do posto (uint8) de cada hash
+    """
+    resto = 64 - precision
+    registro = (hashes >> np.uint64(resto)).astype(np.uint16)
+    w = hashes & np.uint64((1 << resto) - 1)
+    posto = (resto + 1 - _bit_length(w)).astype(np.uint8)
+    return registro, posto
+
+def build_sketches(df1, keys=SKETCH_KEYS, column='Delivery_person_ID'):
+    """ Esta função monta os sketches HyperLogLog dos valores distintos de uma coluna
+
+        Cada célula (por padrão dia x cidade x trânsito) guarda só os
+        registros ocupados, com o maior posto de cada um (forma esparsa). Os
+        sketches são juntados pelo máximo de cada registro, então a contagem
+        de distintos de qualquer combinação de células (semanas, cidades, o
+        período todo) sai dos sketches, sem voltar às linhas.
+
+        Input:
+            - df1: Dataframe limpo
+            - keys: dimensões das células (a primeira deve ser Order_Date)
+            - column: coluna cujos valores distintos são contados
+        Output: Dataframe com keys + 'registro' + 'posto', ordenado pela data
+    """
+    hashes, validos = hash_values(df1[column])
+    registro, posto = hll_registers(hashes)
+
+    celulas = df1.loc[:, keys] if validos.all() else df1.loc[validos, keys]
+    celulas = celulas.assign(registro=registro, posto=posto)
+
+    sketches = celulas.groupby(keys + ['registro'], observed=True)['posto'].max().reset_index()
+    return sketches.sort_values('Order_Date', kind='stable').reset_index(drop=True)
+
+def merge_sketches(sketches, sketches_batch, keys=SKETCH_KEYS):
+    """ Junta os sketches atuais com os de um lote novo (máximo de cada registro por célula) """
+    return merge_cells(sketches, sketches_batch, keys + ['registro'],
+                       lambda celulas: celulas.groupby(keys + ['registro'], observed=True)['posto'].max().reset_index())
+
+register_aggregate('driver_sketches', build_sketches, merge_sketches, columns=SKETCH_KEYS + SKETCH_COLUMNS)
+
+def hll_estimate(soma, ocupados, registers=HLL_REGISTERS):
+    """ Esta função aplica o estimador HyperLogLog
+
+        Input:
+            - soma: soma de 2**-posto dos registros ocupados (escalar ou array)
+            - ocupados: quantidade de registros ocupados
+            - registers: quantidade de registros do sketch
+        Output: estimativa da quantidade de valores distintos (float)
+    """
+    soma = np.asarray(soma, dtype=np.float64)
+    vazios = registers - np.asarray(ocupados, dtype=np.float64)
+    alpha = 0.7213 / (1 + 1.079 / registers)
+    bruta = alpha * registers * registers / (soma + vazios)
+
+    # contagem linear para cardinalidades pequenas (registros vazios sobrando)
+    with np.errstate(divide='ignore'):
+        linear = registers * np.log(registers / np.where(vazios > 0, vazios, 1))
+    return np.where((bruta <= 2.5 * registers) & (vazios > 0), linear, bruta)
+
+def estimate_distinct(sketches, by=None):
+    """ Esta função estima os valores distintos juntando os sketches
+
+        Input:
+            - sketches: sketches (já filtrados) de build_sketches
+            - by: agrupamento das células: lista de dimensões, array/Series
+                  alinhado às linhas (por exemplo o período de time_bucket)
+                  ou None para o total
+        Output: inteiro (by=None) ou Series com a estimativa por grupo
+    """
+    if by is None:
+        registros = sketches.groupby('registro')['posto'].max()
+        return int(round(float(hll_estimate(np.exp2(-registros.to_numpy(dtype=np.float64)).sum(), len(registros)))))
+
+    grupos = [sketches[col] for col in by] if isinstance(by, list) else [pd.Series(np.asarray(by), index=sketches.index)]
+    registros = sketches['posto'].groupby(grupos + [sketches['registro']], observed=True).max()
+    inversos = np.exp2(-registros.astype(np.float64))
+    niveis = list(range(len(grupos)))
+    resumo = inversos.groupby(level=niveis, observed=True).agg(['sum', 'count'])
+    estimativa = hll_estimate(resumo['sum'].to_numpy(), resumo['count'].to_numpy())
+    return pd.Series(np.round(estimativa).astype(np.int64), index=resumo.index)
@@ -0,0 +1,271 @@
+# Bibliotecas necessárias
+import os
+import tempfile
+import threading
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc
+
+# Versão do formato do snapshot: incrementar sempre que as colunas gravadas
+# mudarem, para que snapshots antigos sejam considerados desatualizados
+FORMAT_VERSION = 3
+
+# Chaves gravadas nos metadados do snapshot
+_META_SHA1 = b'source_sha1'
+_META_MTIME = b'source_mtime_ns'
+_META_SIZE = b'source_size'
+_META_FORMAT = b'format_version'
+_META_BASE = b'base_sha1'
+_META_SCHEMA = b'aggregate_schema'
+
+# Cache dos metadados lidos: caminho -> ((mtime, tamanho), metadados)
+_metadata = {}
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def snapshot_path(path):
+    """ Caminho do snapshot colunar correspondente a um csv ('train.csv' -> 'train.arrow') """
+    return os.path.splitext(path)[0] + '.arrow'
+
+def _tmp_path(path):
+    # um arquivo temporário por processo e thread, que podem gravar o mesmo arquivo ao mesmo tempo
+    return f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+def _write_table(df1, path, extra_metadata):
+    table = pa.Table.from_pandas(df1, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata.update(extra_metadata)
+    metadata[_META_FORMAT] = str(FORMAT_VERSION).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # grava em arquivo temporário e troca de forma atômica
+    tmp_path = _tmp_path(path)
+    try:
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+def write_snapshot(df1, path, source_sha1, source_stat):
+    """ Esta função grava o dataframe limpo em formato colunar (Arrow IPC)
+
+        O arquivo é gravado sem compressão para poder ser lido via memory map.
+        Colunas categóricas viram colunas com dicionário. O hash, mtime e
+        tamanho do csv de origem ficam nos metadados do schema.
+
+        Input:
+            - df1: Dataframe limpo
+            - path: caminho do snapshot
+            - source_sha1: hash do csv de origem
+            - source_stat: os.stat() do csv de origem
+        Output: None
+    """
+    _write_table(df1, path, {
+        _META_SHA1: source_sha1.encode(),
+        _META_MTIME: str(source_stat.st_mtime_ns).encode(),
+        _META_SIZE: str(source_stat.st_size).encode(),
+    })
+
+def _dictionary_table(df1, dicionarios):
+    # o formato de arquivo Arrow aceita um único dicionário por coluna, que só
+    # pode crescer (delta): os valores novos de cada lote vão para o fim do
+    # dicionário, e os códigos do lote são traduzidos para as posições nele
+    table = pa.Table.from_pandas(df1, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if not pa.types.is_dictionary(field.type):
+            continue
+        serie = df1[field.name]
+        categorias = serie.cat.categories
+        conhecidas = dicionarios.get(field.name, categorias[:0])
+        conhecidas = conhecidas.append(categorias[~categorias.isin(conhecidas)])
+        dicionarios[field.name] = conhecidas
+
+        codes = serie.cat.codes.to_numpy()
+        indices = conhecidas.get_indexer(categorias)[codes]
+        coluna = pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32(), mask=codes < 0),
+            pa.array(conhecidas.to_numpy(), type=field.type.value_type))
+        table = table.set_column(i, field.name, coluna)
+    return table.replace_schema_metadata(None)
+
+def write_snapshot_batches(frames, path, source_sha1, source_stat):
+    """ Esta função grava o snapshot colunar lote a lote, sem juntar os lotes em memória
+
+        As colunas categóricas continuam com dicionário: cada coluna tem um
+        único dicionário no arquivo, acrescido dos valores novos de cada lote.
+        As categorias ficam na ordem em que apareceram (o dataset as reordena
+        na leitura). O schema do primeiro lote vale para todos.
+
+        Input:
+            - frames: iterável de Dataframes limpos, com as mesmas colunas
+            - path: caminho do snapshot
+            - source_sha1: hash do csv de origem
+            - source_stat: os.stat() do csv de origem
+        Output: quantidade de linhas gravadas
+    """
+    tmp_path = _tmp_path(path)
+    writer = None
+    dicionarios = {}
+    linhas = 0
+    try:
+        for df1 in frames:
+            table = _dictionary_table(df1, dicionarios)
+            if writer is None:
+                schema = table.schema.with_metadata({
+                    _META_SHA1: source_sha1.encode(),
+                    _META_MTIME: str(source_stat.st_mtime_ns).encode(),
+                    _META_SIZE: str(source_stat.st_size).encode(),
+                    _META_FORMAT: str(FORMAT_VERSION).encode(),
+                })
+                options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+                writer = pa.ipc.new_file(tmp_path, schema, options=options)
+            writer.write_table(table.cast(schema))
+            linhas += len(df1)
+            # o lote gravado é liberado antes de o próximo ser lido
+            del df1, table
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f'nenhum lote para gravar em {path}')
+    os.replace(tmp_path, path)
+    return linhas
+
+def aggregates_dir(path):
+    """ Diretório dos agregados gravados de um csv ('train.csv' -> 'train.aggregates') """
+    return os.path.splitext(path)[0] + '.aggregates'
+
+def write_aggregate(df_aux, path, name, version, schema):
+    """ Grava um agregado do dataset (cubo, grade, ...) calculado para uma versão do csv
+
+        O agregado é identificado pelo hash do csv (version) e pela versão do
+        código que o calculou (schema, veja utils.dataset.register_aggregate).
+    """
+    diretorio = aggregates_dir(path)
+    os.makedirs(diretorio, exist_ok=True)
+    _write_table(df_aux, os.path.join(diretorio, f'{name}.arrow'), {
+        _META_SHA1: version.encode(),
+        _META_SCHEMA: str(schema).encode(),
+    })
+
+def read_aggregate(path, name, version, schema):
+    """ Lê um agregado gravado, ou retorna None se ele não existe ou é de outra versão do csv ou do código """
+    aggregate_path = os.path.join(aggregates_dir(path), f'{name}.arrow')
+    metadata = read_metadata(aggregate_path)
+    if metadata is None or metadata['sha1'] != version or metadata['schema'] != str(schema):
+        return None
+    return read_snapshot(aggregate_path)
+
+def read_metadata(path):
+    """ Esta função lê apenas o cabeçalho do snapshot
+
+        Input: caminho do snapshot
+        Output: dict com 'sha1', 'mtime_ns' e 'size' do csv de origem (e
+                'base_sha1' nos lotes incrementais, 'schema' nos agregados),
+                ou None se o snapshot não existe ou é de outra versão do formato
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _metadata.get(path)
+    if cached is None or cached[0] != key:
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        if metadata.get(_META_FORMAT) == str(FORMAT_VERSION).encode():
+            info = {
+                'sha1': metadata[_META_SHA1].decode(),
+                'mtime_ns': int(metadata.get(_META_MTIME, 0)),
+                'size': int(metadata.get(_META_SIZE, 0)),
+                'base_sha1': metadata.get(_META_BASE, b'').decode(),
+                'schema': metadata.get(_META_SCHEMA, b'').decode(),
+            }
+        else:
+            info = None
+        _metadata[path] = (key, info)
+
+    return _metadata[path][1]
+
+def read_snapshot(path):
+    """ Esta função carrega o snapshot via memory map
+
+        Input: caminho do snapshot
+        Output: Dataframe limpo
+    """
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+def deltas_dir(path):
+    """ Diretório dos lotes incrementais de um csv ('train.csv' -> 'train.deltas') """
+    return os.path.splitext(path)[0] + '.deltas'
+
+def list_deltas(path, base_sha1):
+    """ Esta função lista os lotes incrementais gravados sobre uma versão do csv base
+
+        Lotes gravados sobre outra versão do csv (por exemplo, antes de o csv
+        ser substituído por um arquivo completo) são ignorados.
+
+        Input:
+            - path: caminho do csv base
+            - base_sha1: hash do csv base
+        Output: lista ordenada de (caminho do lote, hash do csv do lote)
+    """
+    diretorio = deltas_dir(path)
+    if not os.path.isdir(diretorio):
+        return []
+
+    deltas = []
+    for nome in sorted(os.listdir(diretorio)):
+        if not nome.endswith('.arrow'):
+            continue
+        delta_path = os.path.join(diretorio, nome)
+        metadata = read_metadata(delta_path)
+        if metadata is not None and metadata['base_sha1'] == base_sha1:
+            deltas.append((delta_path, metadata['sha1']))
+    return deltas
+
+def write_delta(df1, path, base_sha1, batch_sha1):
+    """ Esta função grava um lote incremental já limpo ao lado do snapshot base
+
+        O lote é gravado num arquivo temporário único e ganha o seu número de
+        sequência com os.link, que falha se o nome já existe: duas ingestões
+        simultâneas nunca gravam no mesmo arquivo, e um leitor nunca vê um
+        lote pela metade.
+
+        Input:
+            - df1: Dataframe limpo do lote
+            - path: caminho do csv base
+            - base_sha1: hash do csv base sobre o qual o lote é aplicado
+            - batch_sha1: hash do csv do lote
+        Output: caminho do lote gravado
+    """
+    diretorio = deltas_dir(path)
+    os.makedirs(diretorio, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix='lote-', suffix='.pending', dir=diretorio)
+    os.close(fd)
+    try:
+        _write_table(df1, tmp_path, {
+            _META_SHA1: batch_sha1.encode(),
+            _META_BASE: base_sha1.encode(),
+        })
+
+        numeros = [int(nome[:-len('.arrow')]) for nome in os.listdir(diretorio)
+                   if nome.endswith('.arrow') and nome[:-len('.arrow')].isdigit()]
+        sequencia = max(numeros, default=-1) + 1
+        while True:
+            delta_path = os.path.join(diretorio, f'{sequencia:06d}.arrow')
+            try:
+                os.link(tmp_path, delta_path)
+                return delta_path
+            except FileExistsError:
+                # outra ingestão ficou com esse número
+                sequencia += 1
+    finally:
+        os.unlink(tmp_path)
@@ -0,0 +1,77 @@
+# Bibliotecas necessárias
+import os
+import sys
+
+import pandas as pd
+
+from utils import snapshot
+from utils.dataset import DATASET_PATH, aggregate_schema, file_fingerprint, prepare_frame, registered_aggregates
+
+# Quantidade de linhas do csv lidas por lote
+CHUNK_ROWS = 200_000
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def iter_clean_batches(path=DATASET_PATH, chunksize=CHUNK_ROWS):
+    """ Esta função lê o csv em lotes de tamanho limitado e limpa cada lote
+
+        Input:
+            - path: caminho do csv
+            - chunksize: linhas do csv por lote
+        Output: gerador de Dataframes limpos (prepare_frame)
+    """
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        df1 = prepare_frame(chunk)
+        # o lote bruto é liberado antes do próximo ser lido
+        del chunk
+        yield df1
+        del df1
+
+def stream_ingest(path=DATASET_PATH, chunksize=CHUNK_ROWS):
+    """ Esta função processa um csv maior que a memória, lote a lote
+
+        Cada lote limpo é gravado direto no snapshot colunar e somado aos
+        agregados registrados (cubo, grade do mapa, ...). O dataset completo
+        nunca fica em memória: o pico é de um lote mais os agregados. Os
+        agregados são gravados no disco, e os dashboards os leem sem
+        recalcular a partir das linhas.
+
+        Média e desvio padrão do tempo de entrega e das avaliações ficam no
+        cubo como contagem, média e M2 por célula, juntados lote a lote pela
+        fórmula de Chan (utils.cube.combine_cells); as contagens por dia e por
+        semana saem do cubo e da dimensão calendário, para qualquer filtro.
+
+        Input:
+            - path: caminho do csv
+            - chunksize: linhas do csv por lote
+        Output: dict com 'linhas' (quantidade gravada) e 'agregados' (nomes gravados)
+    """
+    stat = os.stat(path)
+    version = file_fingerprint(path)
+
+    mergeable = {name: funcs for name, funcs in registered_aggregates().items() if funcs[1] is not None}
+    aggregates = {}
+
+    def lotes():
+        for df1 in iter_clean_batches(path, chunksize):
+            for name, (build, merge) in mergeable.items():
+                parcial = build(df1)
+                aggregates[name] = merge(aggregates[name], parcial) if name in aggregates else parcial
+            del parcial
+            yield df1
+            del df1
+
+    linhas = snapshot.write_snapshot_batches(lotes(), snapshot.snapshot_path(path), version, stat)
+    for name, aggregate in aggregates.items():
+        snapshot.write_aggregate(aggregate, path, name, version, aggregate_schema(name))
+
+    return {'linhas': linhas, 'agregados': sorted(aggregates)}
+
+if __name__ == '__main__':
+    # Uso: python -m utils.stream [train.csv] [linhas por lote]
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DATASET_PATH
+    chunksize = int(sys.argv[2]) if len(sys.argv) > 2 else CHUNK_ROWS
+    resultado = stream_ingest(csv_path, chunksize)
+    print(f"{resultado['linhas']} linhas gravadas em {snapshot.snapshot_path(csv_path)}")
+    print(f"  agregados em {snapshot.aggregates_dir(csv_path)}: {', '.join(resultado['agregados'])}")
@@ -0,0 +1,105 @@
+# Bibliotecas necessárias
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.profiling import current_profile
+
+# Linhas por página enviadas ao navegador
+PAGE_SIZE = 50
+
+# ===========================================================================
+# Funções
+# ===========================================================================
+def search_rows(df_aux, text, columns=None):
+    """ Esta função filtra as linhas que contêm o texto em alguma coluna de texto
+
+        A busca ignora maiúsculas/minúsculas. Nas colunas categóricas o texto
+        é procurado só nas categorias (poucas) e não linha a linha.
+
+        Input:
+            - df_aux: Dataframe
+            - text: texto procurado (vazio = todas as linhas)
+            - columns: colunas pesquisadas (padrão: colunas de texto e categóricas)
+        Output: Dataframe filtrado
+    """
+    text = text.strip()
+    if not text:
+        return df_aux
+
+    if columns is None:
+        columns = [col for col in df_aux.columns
+                   if isinstance(df_aux[col].dtype, pd.CategoricalDtype) or df_aux[col].dtype == object]
+
+    linhas = np.zeros(len(df_aux), dtype=bool)
+    for col in columns:
+        valores = df_aux[col]
+        if isinstance(valores.dtype, pd.CategoricalDtype):
+            categorias = valores.cat.categories
+            achadas = categorias[categorias.astype(str).str.contains(text, case=False, regex=False)]
+            linhas |= valores.isin(achadas).to_numpy()
+        else:
+            linhas |= valores.astype(str).str.contains(text, case=False, regex=False).to_numpy()
+    return df_aux.loc[linhas, :]
+
+def page_slice(df_aux, sort_by=None, ascending=True, page=1, page_size=PAGE_SIZE):
+    """ Esta função ordena a tabela e retorna só a página pedida
+
+        Input:
+            - df_aux: Dataframe completo (já filtrado pela busca)
+            - sort_by: coluna de ordenação (None = ordem original)
+            - ascending: ordem crescente
+            - page: número da página, começando em 1
+            - page_size: linhas por página
+        Output: Dataframe com no máximo page_size linhas
+    """
+    if sort_by is not None:
+        df_aux = df_aux.sort_values(sort_by, ascending=ascending, kind='stable', na_position='last')
+    inicio = (page - 1) * page_size
+    return df_aux.iloc[inicio:inicio + page_size]
+
+def _clamp_page(state_key, paginas):
+    # a página guardada pode não existir mais depois de uma busca
+    if st.session_state.get(state_key, 1) > paginas:
+        st.session_state[state_key] = paginas
+
+def paged_table(df_aux, key, page_size=PAGE_SIZE, search_columns=None):
+    """ Esta função desenha uma tabela paginada, com busca e ordenação no servidor
+
+        A tabela completa fica no servidor; a cada rerun só a página visível é
+        serializada e enviada ao navegador, então o tamanho da mensagem não
+        cresce com a quantidade de linhas.
+
+        Input:
+            - df_aux: Dataframe completo
+            - key: prefixo único das chaves dos widgets da tabela
+            - page_size: linhas por página
+            - search_columns: colunas pesquisadas pela busca (padrão: colunas de texto)
+        Output: None
+    """
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        texto = st.text_input('Buscar', key=f'{key}_busca')
+    with col2:
+        sort_by = st.selectbox('Ordenar por', ['—'] + list(df_aux.columns), key=f'{key}_ordem')
+    with col3:
+        decrescente = st.checkbox('Decrescente', key=f'{key}_desc')
+
+    with current_profile().stage(f'table.{key}', rows=len(df_aux)):
+        df_aux = search_rows(df_aux, texto, search_columns)
+        paginas = max(1, math.ceil(len(df_aux) / page_size))
+
+        # rótulo e limites fixos: o id do widget não muda com a quantidade de
+        # páginas (que muda com a busca), então a página escolhida é mantida;
+        # o máximo é aplicado aqui e no on_change
+        _clamp_page(f'{key}_pagina', paginas)
+        pagina = st.number_input('Página', min_value=1, step=1, key=f'{key}_pagina',
+                                 on_change=_clamp_page, args=(f'{key}_pagina', paginas))
+
+        visivel = page_slice(df_aux, None if sort_by == '—' else sort_by, not decrescente, pagina, page_size)
+
+    st.dataframe(visivel, hide_index=True, use_container_width=True)
+    inicio = (pagina - 1) * page_size
+    st.caption(f'Página {pagina} de {paginas} · Linhas {min(inicio + 1, len(df_aux))}–{inicio + len(visivel)} de {len(df_aux)}')